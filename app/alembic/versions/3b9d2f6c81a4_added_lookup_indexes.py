@@ -0,0 +1,53 @@
+"""added lookup indexes
+
+Revision ID: 3b9d2f6c81a4
+Revises: 7412af1e26ea
+Create Date: 2026-10-18 12:04:11.512300
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2f6c81a4'
+down_revision: Union[str, None] = '7412af1e26ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RECORD_TABLES = ('step_record', 'weight_record', 'water_intake_record')
+
+
+def upgrade() -> None:
+    # Индексы строятся CONCURRENTLY, чтобы не блокировать запись в больших таблицах,
+    # поэтому миграция выполняется вне транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_phone_number_active', 'user', ['phone_number'], unique=False,
+            postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_user_username_active', 'user', ['username'], unique=False,
+            postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_phone_verification_phone_number_code', 'phone_verification', ['phone_number', 'code'],
+            unique=False, postgresql_concurrently=True,
+        )
+        for table in RECORD_TABLES:
+            op.create_index(
+                f'ix_{table}_user_id_recorded_at_id', table, ['user_id', 'recorded_at', 'id'],
+                unique=False, postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in RECORD_TABLES:
+            op.drop_index(f'ix_{table}_user_id_recorded_at_id', table_name=table, postgresql_concurrently=True)
+        op.drop_index('ix_phone_verification_phone_number_code', table_name='phone_verification',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_user_username_active', table_name='user', postgresql_concurrently=True)
+        op.drop_index('ix_user_phone_number_active', table_name='user', postgresql_concurrently=True)
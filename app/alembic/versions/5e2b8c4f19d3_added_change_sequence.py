@@ -0,0 +1,44 @@
+"""added change sequence
+
+Revision ID: 5e2b8c4f19d3
+Revises: 9c4e1a7d52b0
+Create Date: 2026-10-18 18:42:05.318227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8c4f19d3'
+down_revision: Union[str, None] = '9c4e1a7d52b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RECORD_TABLES = ('step_record', 'weight_record', 'water_intake_record')
+
+
+def upgrade() -> None:
+    # Колонки с постоянным значением по умолчанию добавляются без перезаписи таблиц,
+    # существующие записи получают номер изменения 0 и попадают в первую синхронизацию
+    op.add_column('user', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    for table in RECORD_TABLES:
+        op.add_column(table, sa.Column('seq', sa.BigInteger(), server_default='0', nullable=False))
+
+    with op.get_context().autocommit_block():
+        for table in RECORD_TABLES:
+            op.create_index(
+                f'ix_{table}_user_id_seq', table, ['user_id', 'seq'], unique=False, postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in RECORD_TABLES:
+            op.drop_index(f'ix_{table}_user_id_seq', table_name=table, postgresql_concurrently=True)
+
+    for table in RECORD_TABLES:
+        op.drop_column(table, 'seq')
+    op.drop_column('user', 'change_seq')
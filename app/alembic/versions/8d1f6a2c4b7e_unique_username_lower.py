@@ -0,0 +1,50 @@
+"""unique username lower
+
+Revision ID: 8d1f6a2c4b7e
+Revises: 5e2b8c4f19d3
+Create Date: 2026-10-18 19:27:41.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1f6a2c4b7e'
+down_revision: Union[str, None] = '5e2b8c4f19d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Никнеймы, совпадающие без учета регистра, остаются только у самого раннего пользователя,
+    # у остальных никнейм сбрасывается и задается заново
+    op.execute(
+        """
+        UPDATE "user" SET username = NULL
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY lower(username) ORDER BY created_at, id) AS position
+            FROM "user"
+            WHERE username IS NOT NULL AND is_deleted = false
+        ) AS duplicates
+        WHERE "user".id = duplicates.id AND duplicates.position > 1
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_username_lower_active', 'user', [sa.text('lower(username)')], unique=True,
+            postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True,
+        )
+        op.drop_index('ix_user_username_active', table_name='user', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_username_active', 'user', ['username'], unique=False,
+            postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True,
+        )
+        op.drop_index('ix_user_username_lower_active', table_name='user', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""dropped phone verification
+
+Revision ID: 9c4e1a7d52b0
+Revises: 3b9d2f6c81a4
+Create Date: 2026-10-18 14:21:37.102944
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e1a7d52b0'
+down_revision: Union[str, None] = '3b9d2f6c81a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Коды подтверждения теперь хранятся в OTP-хранилище с временем жизни
+    op.drop_index('ix_phone_verification_phone_number_code', table_name='phone_verification')
+    op.drop_table('phone_verification')
+
+
+def downgrade() -> None:
+    op.create_table('phone_verification',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('phone_number', sa.String(), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id')
+    )
+    op.create_index('ix_phone_verification_phone_number_code', 'phone_verification', ['phone_number', 'code'],
+                    unique=False)
@@ -0,0 +1,87 @@
+"""canonical phone numbers
+
+Revision ID: b4e7c2a9d815
+Revises: 8d1f6a2c4b7e
+Create Date: 2026-10-18 20:05:13.640921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import phonenumbers
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e7c2a9d815'
+down_revision: Union[str, None] = '8d1f6a2c4b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RECORD_TABLES = ('step_record', 'weight_record', 'water_intake_record')
+
+
+def _canonical(phone_number: str) -> str | None:
+    # Копия правил core.phone на момент миграции: миграция не должна меняться вместе с кодом приложения
+    try:
+        parsed = phonenumbers.parse(phone_number, 'RU')
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def upgrade() -> None:
+    # Номера приводятся к E.164. Активные пользователи с одним номером объединяются в самого раннего:
+    # его история пополняется записями дубликатов, а дубликаты помечаются удаленными.
+    # Перенесенные записи получают новый номер изменения, чтобы клиенты получили их при синхронизации.
+    # Номера, которые не разбираются, остаются как есть, а их точные дубликаты объединяются так же,
+    # иначе уникальный индекс не построится.
+    bind = op.get_bind()
+    users = bind.execute(
+        sa.text('SELECT id, phone_number FROM "user" WHERE is_deleted = false ORDER BY created_at, id')
+    ).all()
+
+    groups: dict[str, list] = {}
+    for user_id, phone_number in users:
+        groups.setdefault(_canonical(phone_number) or phone_number, []).append((user_id, phone_number))
+
+    for canonical, members in groups.items():
+        (keeper_id, keeper_phone), duplicate_ids = members[0], [user_id for user_id, _ in members[1:]]
+        if duplicate_ids:
+            change_seq = bind.execute(
+                sa.text('UPDATE "user" SET change_seq = change_seq + 1 WHERE id = :id RETURNING change_seq'),
+                {"id": keeper_id},
+            ).scalar_one()
+            for table in RECORD_TABLES:
+                bind.execute(
+                    sa.text(f'UPDATE {table} SET user_id = :keeper_id, seq = :seq WHERE user_id = ANY(:ids)'),
+                    {"keeper_id": keeper_id, "seq": change_seq, "ids": duplicate_ids},
+                )
+            bind.execute(
+                sa.text('UPDATE "user" SET is_deleted = true WHERE id = ANY(:ids)'),
+                {"ids": duplicate_ids},
+            )
+        if keeper_phone != canonical:
+            bind.execute(
+                sa.text('UPDATE "user" SET phone_number = :phone_number WHERE id = :id'),
+                {"phone_number": canonical, "id": keeper_id},
+            )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_phone_number_unique_active', 'user', ['phone_number'], unique=True,
+            postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True,
+        )
+        op.drop_index('ix_user_phone_number_active', table_name='user', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    # Объединение пользователей и исходный вид номеров не восстанавливаются
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_phone_number_active', 'user', ['phone_number'], unique=False,
+            postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True,
+        )
+        op.drop_index('ix_user_phone_number_unique_active', table_name='user', postgresql_concurrently=True)
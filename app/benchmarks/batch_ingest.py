@@ -0,0 +1,69 @@
+"""Пропускная способность пакетной загрузки записей.
+
+Запуск из каталога app против локальной базы с примененными миграциями:
+``python -m benchmarks.batch_ingest``.
+
+Целевые показатели на одном воркере и локальном Postgres:
+    - пакет из 1 000 записей сохраняется быстрее 100 мс;
+    - пакет из 10 000 записей - не менее 30 000 записей/с с учетом валидации;
+    - пакетная загрузка минимум в 50 раз быстрее, чем по одной записи через update_user_info.
+"""
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from core.dependencies import async_engine, async_session
+from schemas.user import UserStepsSchema, UserUpdateSchema
+from services.user_service import UserService
+
+BATCH_SIZES = (100, 1_000, 10_000)
+SINGLE_WRITES = 200
+
+
+def make_records(count: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    kinds = (
+        ("steps", "steps_count", lambda: random.randint(0, 20_000)),
+        ("weight", "weight", lambda: round(random.uniform(50, 120), 1)),
+        ("water", "water_amount", lambda: round(random.uniform(0.1, 1.0), 2)),
+    )
+    records = []
+    for i in range(count):
+        kind, field, value = kinds[i % 3]
+        records.append({"type": kind, field: value(), "recorded_at": (now - timedelta(minutes=i)).isoformat()})
+    return records
+
+
+async def main() -> None:
+    phone_number = f"+7999{random.randint(0, 9_999_999):07d}"
+
+    async with async_session() as db:
+        user_service = UserService(db_session=db)
+        await user_service.create_user_by_phone_number(phone_number=phone_number)
+
+        for size in BATCH_SIZES:
+            records = make_records(size)
+            started = time.perf_counter()
+            result = await user_service.add_records_batch(phone_number=phone_number, records=records)
+            elapsed = time.perf_counter() - started
+            print(
+                f"пакет {size:>6}: {elapsed * 1000:8.1f} мс, {result.accepted / elapsed:10.0f} записей/с"
+            )
+
+        started = time.perf_counter()
+        for i in range(SINGLE_WRITES):
+            await user_service.update_user_info(
+                phone_number=phone_number,
+                data=UserUpdateSchema(steps=UserStepsSchema(steps_count=i, recorded_at=datetime.now(timezone.utc))),
+            )
+        elapsed = time.perf_counter() - started
+        print(f"по одной записи: {SINGLE_WRITES / elapsed:10.0f} записей/с")
+
+        await user_service.delete_user(phone_number=phone_number)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""Холодный старт: время импорта приложения и время до первого ответа ASGI приложения.
+
+Каждый замер выполняется в новом процессе, как при запуске воркера.
+Запуск из каталога app: ``python -m benchmarks.cold_start``.
+Стоимость импорта по модулям: ``python -m benchmarks.cold_start --profile``.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+RUNS = 10
+
+FIRST_RESPONSE = """
+import asyncio, json, time
+started = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+from httpx import ASGITransport, AsyncClient
+
+async def first_response():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/health/liveness")
+        assert response.status_code == 200, response.text
+
+asyncio.run(first_response())
+print(json.dumps({"import": imported - started, "first_response": time.perf_counter() - started}))
+"""
+
+
+def measure(runs: int) -> None:
+    results = defaultdict(list)
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", FIRST_RESPONSE], capture_output=True, text=True, check=True,
+        ).stdout
+        for name, seconds in json.loads(output.splitlines()[-1]).items():
+            results[name].append(seconds)
+
+    for name, samples in results.items():
+        print(f"{name:15} медиана {statistics.median(samples) * 1000:7.1f} мс, максимум {max(samples) * 1000:7.1f} мс")
+
+
+def profile(top: int) -> None:
+    """Собственное время импорта модулей, сгруппированное по пакету верхнего уровня, из python -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], capture_output=True, text=True, check=True,
+    ).stderr
+
+    packages: dict[str, int] = defaultdict(int)
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        packages[module.strip().split(".")[0]] += int(self_us)
+        if module.strip() == "main":
+            total = int(cumulative_us)
+
+    print(f"{'пакет':30} {'мс':>8} {'доля':>6}")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{package:30} {self_us / 1000:8.1f} {self_us / total:6.1%}")
+    print(f"{'всего import main':30} {total / 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile", action="store_true", help="стоимость импорта по пакетам вместо замера старта")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    if args.profile:
+        profile(args.top)
+    else:
+        measure(args.runs)
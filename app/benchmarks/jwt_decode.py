@@ -0,0 +1,35 @@
+"""Сравнение стоимости проверки JWT с кешем и без него.
+
+Запуск из каталога app: ``python -m benchmarks.jwt_decode``.
+"""
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from jose import jwt
+
+from core.config import Settings, get_app_settings
+from core.security import decode_token, token_cache
+
+app_settings: Settings = get_app_settings()
+
+NUMBER = 20_000
+
+
+def main() -> None:
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=app_settings.access_token_expire_minutes)
+    token = jwt.encode(
+        {"exp": expires_at, "sub": "+79183394882"}, app_settings.jwt_secret_key, app_settings.jwt_algorithm,
+    )
+
+    token_cache.clear()
+    uncached = timeit.timeit(lambda: decode_token(token, is_refresh=False, use_cache=False), number=NUMBER)
+    decode_token(token, is_refresh=False)
+    cached = timeit.timeit(lambda: decode_token(token, is_refresh=False), number=NUMBER)
+
+    print(f"без кеша: {uncached / NUMBER * 1e6:8.2f} мкс/токен")
+    print(f"с кешем:  {cached / NUMBER * 1e6:8.2f} мкс/токен")
+    print(f"ускорение: x{uncached / cached:.1f}")
+
+
+if __name__ == "__main__":
+    main()
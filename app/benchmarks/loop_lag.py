@@ -0,0 +1,67 @@
+"""Задержка цикла событий при сериализации больших историй на месте и в пуле.
+
+Запуск из каталога app: ``python -m benchmarks.loop_lag``.
+Пока запросы /me с историей в HISTORY_RECORDS записей сериализуются один за другим,
+LoopLagMonitor меряет, насколько опаздывают остальные задачи цикла.
+"""
+import asyncio
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from core.executor import CpuExecutor, LoopLagMonitor
+from schemas.user import ResponseFormat
+from services.serialization import render_user_detail
+
+HISTORY_RECORDS = 20_000
+REQUESTS = 20
+
+UserRow = namedtuple("UserRow", ["id", "phone_number", "username", "height"])
+
+
+def make_history() -> dict[str, list[tuple]]:
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    moments = [start + timedelta(minutes=i) for i in range(HISTORY_RECORDS // 3)]
+    return {
+        "steps": [(i % 20_000, moment) for i, moment in enumerate(moments)],
+        "weight": [(70.5, moment) for moment in moments],
+        "water": [(0.25, moment) for moment in moments],
+    }
+
+
+async def run(executor: CpuExecutor, threshold: int) -> tuple[float, LoopLagMonitor]:
+    user = UserRow(1, "+79183394882", "user", 180)
+    history = make_history()
+    monitor = LoopLagMonitor(interval=0.005)
+    monitor.start()
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await executor.run_sized(
+            HISTORY_RECORDS, threshold, render_user_detail, user, history, response_format=ResponseFormat.JSON,
+        )
+        # Между ответами цикл успевает выполнить остальные задачи, как между запросами в приложении
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+    executor.shutdown()
+    return elapsed, monitor
+
+
+def main() -> None:
+    cases = (
+        ("в цикле", CpuExecutor("thread", workers=1), HISTORY_RECORDS + 1),
+        ("пул потоков", CpuExecutor("thread", workers=1), 0),
+        ("пул процессов", CpuExecutor("process", workers=1), 0),
+    )
+    for name, executor, threshold in cases:
+        elapsed, monitor = asyncio.run(run(executor, threshold))
+        snapshot = monitor.snapshot()
+        mean = snapshot["sum"] / snapshot["count"] if snapshot["count"] else 0.0
+        print(
+            f"{name:14} {elapsed / REQUESTS * 1e3:7.2f} мс/ответ, задержка цикла: "
+            f"средняя {mean * 1e3:6.2f} мс, наибольшая {snapshot['max'] * 1e3:6.2f} мс",
+        )
+
+
+if __name__ == "__main__":
+    main()
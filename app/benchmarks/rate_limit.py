@@ -0,0 +1,37 @@
+"""Накладные расходы проверки лимита частоты запросов на один запрос.
+
+Запуск из каталога app: ``python -m benchmarks.rate_limit``.
+Для проверки Redis: ``RATE_LIMIT_BACKEND=redis python -m benchmarks.rate_limit``.
+"""
+import asyncio
+import time
+
+from core.config import RateLimitPolicy
+from core.rate_limit import get_rate_limiter
+
+NUMBER = 50_000
+KEYS = 10_000
+
+
+async def run(policy_name: str, policy: RateLimitPolicy) -> None:
+    limiter = get_rate_limiter()
+    limiter.policies = {policy_name: policy}
+    route, kind = policy_name.split(":")
+
+    started = time.perf_counter()
+    for i in range(NUMBER):
+        await limiter.check(route, **{kind: f"+7918{i % KEYS:07d}"})
+    elapsed = time.perf_counter() - started
+
+    print(f"{policy.algorithm:15} {elapsed / NUMBER * 1e6:8.2f} мкс/запрос")
+
+
+async def main() -> None:
+    # Лимит заведомо не достигается, измеряется только стоимость учета запроса
+    await run("bench:phone", RateLimitPolicy(algorithm="sliding_window", limit=10**9, period=60))
+    await run("bench:phone", RateLimitPolicy(algorithm="token_bucket", limit=10**9, period=60))
+    await get_rate_limiter().backend.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
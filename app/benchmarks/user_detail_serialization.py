@@ -0,0 +1,78 @@
+"""Сравнение сериализации /me через модели и response_model с прямой сериализацией строк базы,
+и размер ответа в колоночных форматах.
+
+Запуск из каталога app: ``python -m benchmarks.user_detail_serialization``.
+"""
+import asyncio
+import random
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from schemas.user import ResponseFormat, UserDetailSchema, UserStepsSchema, UserWaterSchema, UserWeightSchema
+from services.serialization import dump_user_detail, render_user_detail
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 3
+
+UserRow = namedtuple("UserRow", ["id", "phone_number", "username", "height"])
+
+response_field = create_model_field(name="Response_me", type_=UserDetailSchema, mode="serialization")
+
+
+async def models_path(user: UserRow, history: dict[str, list[tuple]]) -> bytes:
+    """Путь до оптимизации: модель на каждую запись, затем валидация и сериализация response_model."""
+    content = UserDetailSchema(
+        phone_number=user.phone_number,
+        username=user.username,
+        height=user.height,
+        steps=[UserStepsSchema(steps_count=v, recorded_at=t) for v, t in history["steps"]],
+        weight=[UserWeightSchema(weight=v, recorded_at=t) for v, t in history["weight"]],
+        water=[UserWaterSchema(water_amount=v, recorded_at=t) for v, t in history["water"]],
+    )
+    return JSONResponse(await serialize_response(field=response_field, response_content=content)).body
+
+
+async def rows_path(user: UserRow, history: dict[str, list[tuple]]) -> bytes:
+    """Путь после оптимизации: строки базы сразу в JSON."""
+    return dump_user_detail(user, history)
+
+
+async def measure(func) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main() -> None:
+    user = UserRow(1, "+79183394882", "user_1", 180)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for size in SIZES:
+        # size записей на каждый тип истории
+        moments = [start + timedelta(minutes=i) for i in range(size)]
+        history = {
+            "steps": [(random.randint(0, 30_000), moment) for moment in moments],
+            "weight": [(round(random.uniform(50, 120), 1), moment) for moment in moments],
+            "water": [(round(random.uniform(0.1, 4), 2), moment) for moment in moments],
+        }
+
+        assert await rows_path(user, history) == await models_path(user, history)
+
+        slow = await measure(lambda: models_path(user, history))
+        fast = await measure(lambda: rows_path(user, history))
+        print(f"{size:>7} записей: модели {slow * 1000:9.1f} мс, строки {fast * 1000:8.1f} мс, x{slow / fast:.1f}")
+
+        for response_format in ResponseFormat:
+            content = render_user_detail(user, history, response_format)
+            print(f"{'':>17}{response_format.value:48} {len(content) / 1024:9.1f} КБ")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+import asyncio
+import math
+from collections.abc import Callable
+from enum import StrEnum
+
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.exception_handler import http_exception_handler
+
+AUTH_PATHS = ("/user/call", "/user/verify", "/user/refresh")
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RouteClass(StrEnum):
+    """Класс маршрута, у каждого класса свой лимит одновременных запросов."""
+
+    AUTH = "auth"
+    READ = "read"
+    WRITE = "write"
+    HEALTH = "health"
+
+
+def classify_route(method: str, path: str) -> RouteClass:
+    """Определение класса маршрута по методу и пути без префикса api."""
+    if path.startswith(("/health", "/internal")):
+        return RouteClass.HEALTH
+    if path.startswith(AUTH_PATHS):
+        return RouteClass.AUTH
+    if method in READ_METHODS:
+        return RouteClass.READ
+    return RouteClass.WRITE
+
+
+class ConcurrencyLimiter:
+    """Ограничение числа одновременных запросов с ожиданием свободного места не дольше queue_timeout."""
+
+    def __init__(self, limit: int, queue_timeout: float) -> None:
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+    async def acquire(self) -> bool:
+        """Занять место, вернет False если место не освободилось до истечения времени ожидания."""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class AdmissionController:
+    """Лимиты одновременных запросов по классам маршрутов и признак перегрузки пула базы."""
+
+    def __init__(
+        self,
+        limiters: dict[RouteClass, ConcurrencyLimiter],
+        pool_waiting: Callable[[], int],
+        pool_wait_threshold: int,
+        retry_after: float = 1.0,
+    ) -> None:
+        self.limiters = limiters
+        self.pool_waiting = pool_waiting
+        self.pool_wait_threshold = pool_wait_threshold
+        self.retry_after = retry_after
+        self.pool_shed = 0
+
+    def pool_saturated(self) -> bool:
+        """Очередь ожидания соединения в пуле длиннее порога."""
+        if self.pool_waiting() > self.pool_wait_threshold:
+            self.pool_shed += 1
+            return True
+        return False
+
+    def snapshot(self) -> dict:
+        """Состояние лимитов по классам маршрутов."""
+        return {
+            "pool_shed": self.pool_shed,
+            "routes": {
+                route_class.value: {
+                    "limit": limiter.limit,
+                    "in_flight": limiter.in_flight,
+                    "waiting": limiter.waiting,
+                    "shed": limiter.shed,
+                }
+                for route_class, limiter in self.limiters.items()
+            },
+        }
+
+
+class AdmissionControlMiddleware:
+    """Допуск запросов с лимитами по классам маршрутов и сброс нагрузки при перегрузке пула базы.
+
+    Если очередь ожидания соединения в пуле длиннее порога, запросы к базе сразу получают 503,
+    а не ждут соединение до таймаута. Проверка доступности приложения (liveness) не ограничивается никогда.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, prefix: str = "") -> None:
+        self.app = app
+        self.controller = controller
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"].removeprefix(self.prefix)
+        if path == "/health/liveness":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify_route(scope["method"], path)
+        if route_class != RouteClass.HEALTH and self.controller.pool_saturated():
+            await self._reject(scope, receive, send, "База данных перегружена, повторите запрос позже.")
+            return
+
+        limiter = self.controller.limiters.get(route_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await self._reject(scope, receive, send, "Слишком много одновременных запросов, повторите позже.")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, detail: str) -> None:
+        # Ответ собирается общим обработчиком, чтобы формат ProblemDetail не отличался от остальных ошибок
+        exc = HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(math.ceil(self.controller.retry_after))},
+        )
+        response = await http_exception_handler(Request(scope, receive), exc)
+        await response(scope, receive, send)
@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from core.config import Settings, get_app_settings
+
+app_settings: Settings = get_app_settings()
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Ограниченный по размеру LRU-кеш с временем жизни записей.
+
+    Кеш живет внутри процесса и не требует блокировок: все операции синхронные
+    и выполняются в одном event loop без переключений.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Получение значения по ключу, просроченные записи удаляются."""
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Сохранение значения, при переполнении вытесняется самая старая запись."""
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Удаление записи из кеша, если она есть."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Полная очистка кеша."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Кеш авторизованных пользователей по subject токена (номеру телефона)
+principal_cache = TTLCache(
+    maxsize=app_settings.principal_cache_size,
+    ttl=app_settings.principal_cache_ttl_seconds,
+)
+
+# Занятость никнеймов по нормализованному никнейму, True - занят
+username_cache = TTLCache(
+    maxsize=app_settings.username_cache_size,
+    ttl=app_settings.username_taken_ttl_seconds,
+)
@@ -0,0 +1,60 @@
+import time
+from enum import StrEnum
+
+
+class CircuitState(StrEnum):
+    """Состояние предохранителя."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Предохранитель для вызовов внешнего сервиса.
+
+    После failure_threshold ошибок подряд вызовы запрещаются на reset_timeout секунд,
+    затем пропускается один пробный вызов: успех закрывает предохранитель, ошибка снова открывает.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> CircuitState:
+        if self._opened_at is None:
+            return CircuitState.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return CircuitState.HALF_OPEN
+        return CircuitState.OPEN
+
+    def allow(self) -> bool:
+        """Можно ли сейчас выполнить вызов."""
+        match self.state:
+            case CircuitState.CLOSED:
+                return True
+            case CircuitState.HALF_OPEN if not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        return False
+
+    def retry_after(self) -> float:
+        """Через сколько секунд предохранитель пропустит пробный вызов."""
+        if self._opened_at is None:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_in_flight or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
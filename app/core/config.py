@@ -1,9 +1,19 @@
 import os
 from functools import lru_cache
+from typing import Literal
 
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class RateLimitPolicy(BaseModel):
+    """Политика ограничения частоты запросов: не больше limit запросов за period секунд."""
+
+    algorithm: Literal["sliding_window", "token_bucket"] = "sliding_window"
+    limit: int
+    period: float
+
+
 class Settings(BaseSettings):
     """Configuration settings for the application."""
 
@@ -27,9 +37,60 @@ class Settings(BaseSettings):
     pg_username: str = "postgres"
     pg_password: str = "example"
     pool_size: int = 20
+    pool_max_overflow: int = 10
+    # Сколько соединений с одной базой могут держать все воркеры инстанса вместе,
+    # должно быть меньше max_connections Postgres с учетом других инстансов и служебных подключений
+    pg_connection_budget: int | None = None
+    pool_timeout_seconds: float = 30.0
+    pool_recycle_seconds: int = -1
+    pool_pre_ping: bool = True
+    pg_statement_cache_size: int = 100
+    pg_command_timeout_seconds: float | None = None
+    # JIT только замедляет короткие OLTP-запросы приложения
+    pg_server_settings: dict[str, str] = {"jit": "off"}
+
+    # Запуск через run.py: воркеры uvicorn на uvloop и httptools
+    server_host: str = "0.0.0.0"
+    server_port: int = 80
+    web_workers: int = 1
+    server_graceful_shutdown_seconds: float = 30.0
+
+    # Прогрев при старте: соединения пула, подготовленные запросы и HTTP клиент,
+    # по умолчанию открывается pool_size соединений к основной базе и к каждой реплике
+    warmup_enabled: bool = True
+    warmup_connections: int | None = None
+    warmup_timeout_seconds: float = 30.0
+    # Сколько ждать после перевода readiness в draining, чтобы балансировщик перестал слать запросы
+    shutdown_drain_seconds: float = 0.0
+
+    # Реплики для чтения в формате host:port, пользователь и база те же, что у основной
+    pg_replica_hosts: list[str] = []
+    replica_max_lag_seconds: float = 5.0
+    replica_health_check_interval_seconds: float = 5.0
+    replica_health_check_timeout_seconds: float = 1.0
 
     smsru_api_id: str = "smsruapiid"
     smsru_api_url: str = "https://sms.ru/code/call"
+    smsru_connect_timeout_seconds: float = 3.0
+    smsru_read_timeout_seconds: float = 10.0
+    smsru_limit_per_host: int = 20
+    smsru_dns_cache_ttl_seconds: int = 300
+    smsru_keepalive_timeout_seconds: float = 30.0
+
+    # Очередь звонков: повторы с экспоненциальной задержкой и предохранитель от недоступного sms ru
+    call_dispatcher_workers: int = 10
+    call_queue_size: int = 1000
+    call_max_retries: int = 3
+    call_retry_base_delay_seconds: float = 0.5
+    call_retry_max_delay_seconds: float = 5.0
+    call_job_ttl_seconds: float = 600.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout_seconds: float = 30.0
+
+    # memory подходит только для одного воркера, при нескольких воркерах нужен redis
+    otp_store_backend: Literal["memory", "redis"] = "memory"
+    otp_ttl_seconds: int = 300
+    redis_url: str = "redis://localhost:6379/0"
 
     allowed_hosts: list[str] | None = ["localhost"]
 
@@ -39,6 +100,58 @@ class Settings(BaseSettings):
     jwt_secret_key: str = "sJsdhbcd"
     jwt_refresh_secret_key: str = "kqjsdUsd"
 
+    principal_cache_size: int = 10_000
+    principal_cache_ttl_seconds: float = 60.0
+    token_cache_size: int = 10_000
+    # Кеш занятости никнеймов: занятые хранятся дольше, свободные быстро перепроверяются,
+    # а окончательно уникальность проверяет индекс при записи
+    username_cache_size: int = 100_000
+    username_taken_ttl_seconds: float = 300.0
+    username_available_ttl_seconds: float = 5.0
+
+    # Кеш ответов /user/me, свой в каждом воркере; запись через другой воркер видна после ttl
+    me_cache_enabled: bool = True
+    me_cache_max_bytes: int = 64 * 1024 * 1024
+    me_cache_ttl_seconds: float = 60.0
+    me_cache_stale_while_revalidate_seconds: float = 30.0
+    me_cache_stale_if_error_seconds: float = 300.0
+
+    # /api/internal/metrics без авторизации раскрывает адреса баз и нагрузку, включать только
+    # за балансировщиком, который не пропускает /api/internal снаружи
+    internal_metrics_enabled: bool = False
+
+    # Пул для CPU работы вне цикла событий: thread годится, пока работа отпускает GIL или коротка,
+    # process нужен, чтобы разбор больших историй не делил GIL с циклом
+    executor_kind: Literal["thread", "process"] = "thread"
+    executor_workers: int = 4
+    # С какого числа записей сериализация истории и валидация пакета уходят в пул:
+    # меньше переход в пул и обратно дороже самой работы
+    offload_min_history_records: int = 2000
+    offload_min_batch_records: int = 500
+    # Подпись и проверка JWT в пуле: HS256 занимает 25-55 мкс, переход в пул потоков около 60 мкс,
+    # поэтому включать стоит с пулом процессов или с асимметричными алгоритмами
+    offload_jwt: bool = False
+    loop_lag_interval_seconds: float = 0.5
+
+    # Допуск запросов: лимит одновременных запросов по классам маршрутов (auth, read, write, health)
+    admission_enabled: bool = True
+    admission_limits: dict[str, int] = {"auth": 50, "read": 200, "write": 50, "health": 10}
+    admission_queue_timeout_seconds: float = 1.0
+    # Сколько запросов может ждать соединение в пуле, прежде чем новые запросы к базе получат 503
+    admission_pool_wait_threshold: int = 20
+    admission_retry_after_seconds: float = 1.0
+
+    # Ограничение частоты запросов, ключ политики <маршрут>:<phone|ip>
+    rate_limit_enabled: bool = True
+    rate_limit_backend: Literal["memory", "redis"] = "memory"
+    rate_limit_policies: dict[str, RateLimitPolicy] = {
+        "call:phone": RateLimitPolicy(algorithm="token_bucket", limit=3, period=600),
+        "call:ip": RateLimitPolicy(algorithm="sliding_window", limit=20, period=3600),
+        "verify:phone": RateLimitPolicy(algorithm="sliding_window", limit=5, period=300),
+        "verify:ip": RateLimitPolicy(algorithm="token_bucket", limit=30, period=60),
+    }
+    rate_limit_max_keys: int = 100_000
+
     model_config = SettingsConfigDict(env_file=os.getenv("ENV_FILE", ".env"))
 
 
@@ -54,6 +167,30 @@ def get_app_settings() -> Settings:
     return Settings()
 
 
+def pool_limits(settings: Settings) -> tuple[int, int]:
+    """pool_size и max_overflow пула одного воркера к одной базе.
+
+    Если задан pg_connection_budget, то он делится поровну между web_workers,
+    и пул воркера урезается до своей доли: сначала max_overflow, потом pool_size.
+
+    Raises
+    ------
+        ValueError: На воркер приходится меньше одного соединения.
+
+    """
+    if settings.pg_connection_budget is None:
+        return settings.pool_size, settings.pool_max_overflow
+
+    per_worker = settings.pg_connection_budget // settings.web_workers
+    if per_worker < 1:
+        raise ValueError(
+            f"pg_connection_budget={settings.pg_connection_budget} is less than one connection "
+            f"per worker for web_workers={settings.web_workers}"
+        )
+    pool_size = min(settings.pool_size, per_worker)
+    return pool_size, min(settings.pool_max_overflow, per_worker - pool_size)
+
+
 def get_settings_no_cache() -> Settings:
     """Получение настроек без кеша."""
     return Settings()
@@ -1,15 +1,22 @@
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-
-from core.config import Settings, get_app_settings
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from core.admission import AdmissionController, ConcurrencyLimiter, RouteClass
+from core.cache import principal_cache
+from core.config import Settings, get_app_settings, pool_limits
+from core.phone import normalize_phone_number
+from core.pool_metrics import InstrumentedAsyncAdaptedQueuePool, instrument_engine
+from core.replicas import ReplicaRouter
+from core.security import decode_token_offloaded
 from services.user_service import UserService
-from schemas.user import UserSchema, TokenPayloadSchema
+from schemas.user import ResponseFormat, UserSchema
+from services.serialization import negotiate_response_format
 from typing import Annotated
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, Header, HTTPException, status, Request
 from jose import jwt
-from datetime import datetime
+import time
 from pydantic import ValidationError
 
 app_settings: Settings = get_app_settings()
@@ -17,19 +24,54 @@ app_settings: Settings = get_app_settings()
 oauth_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-pg_connection_string = (
-    f"postgresql+asyncpg://{app_settings.pg_username}:{app_settings.pg_password}@"
-    f"{app_settings.pg_host}:{app_settings.pg_port}/{app_settings.pg_database}"
+def create_engine_for_host(host: str) -> AsyncEngine:
+    """Создание движка с настройками пула и соединений из конфигурации.
+
+    Размер пула ограничен долей воркера в pg_connection_budget.
+    """
+    pool_size, max_overflow = pool_limits(app_settings)
+    engine = create_async_engine(
+        f"postgresql+asyncpg://{app_settings.pg_username}:{app_settings.pg_password}@"
+        f"{host}/{app_settings.pg_database}",
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_pre_ping=app_settings.pool_pre_ping,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=app_settings.pool_timeout_seconds,
+        pool_recycle=app_settings.pool_recycle_seconds,
+        connect_args={
+            "statement_cache_size": app_settings.pg_statement_cache_size,
+            "command_timeout": app_settings.pg_command_timeout_seconds,
+            "server_settings": app_settings.pg_server_settings,
+        },
+    )
+    instrument_engine(engine)
+    return engine
+
+
+async_engine = create_engine_for_host(f"{app_settings.pg_host}:{app_settings.pg_port}")
+
+async_session = async_sessionmaker(
+    async_engine, expire_on_commit=False, class_=AsyncSession, autoflush=False,
 )
 
-async_engine = create_async_engine(
-    pg_connection_string,
-    pool_pre_ping=True,
-    pool_size=app_settings.pool_size,
+replica_engines = [create_engine_for_host(replica_host) for replica_host in app_settings.pg_replica_hosts]
+
+replica_router = ReplicaRouter(
+    engines=replica_engines,
+    max_lag_seconds=app_settings.replica_max_lag_seconds,
+    check_interval=app_settings.replica_health_check_interval_seconds,
+    check_timeout=app_settings.replica_health_check_timeout_seconds,
 )
 
-async_session = async_sessionmaker(
-    async_engine, expire_on_commit=False, class_=AsyncSession, autoflush=False,
+admission_controller = AdmissionController(
+    limiters={
+        RouteClass(route_class): ConcurrencyLimiter(limit=limit, queue_timeout=app_settings.admission_queue_timeout_seconds)
+        for route_class, limit in app_settings.admission_limits.items()
+    },
+    pool_waiting=lambda: async_engine.pool.metrics.waiting,
+    pool_wait_threshold=app_settings.admission_pool_wait_threshold,
+    retry_after=app_settings.admission_retry_after_seconds,
 )
 
 
@@ -42,9 +84,37 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         await db.close()
 
 
-def get_user_service(db: Annotated[AsyncSession, Depends(get_db)]) -> UserService:
+async def open_read_session() -> AsyncSession:
+    """Открытие сессии на здоровой реплике, если реплик нет, то на основной базе."""
+    replica_engine = await replica_router.choose()
+    if replica_engine is None:
+        return async_session()
+    return async_session(bind=replica_engine)
+
+
+async def get_read_db(db: Annotated[AsyncSession, Depends(get_db)]) -> AsyncGenerator[AsyncSession, None]:
+    """Зависимость для получения сессии только для чтения.
+
+    Если реплик нет или все они недоступны, то отдается сессия основной базы из get_db.
+    """
+    replica_engine = await replica_router.choose()
+    if replica_engine is None:
+        yield db
+        return
+
+    read_db = async_session(bind=replica_engine)
+    try:
+        yield read_db
+    finally:
+        await read_db.close()
+
+
+def get_user_service(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    read_db: Annotated[AsyncSession, Depends(get_read_db)],
+) -> UserService:
     """Возвращает экземпляр UserService."""
-    return UserService(db_session=db)
+    return UserService(db_session=db, read_session=read_db)
 
 
 async def get_current_user(
@@ -54,35 +124,10 @@ async def get_current_user(
 ) -> UserSchema:
     is_refresh_endpoint = request.url.path == "/api/user/refresh"
 
-    secret_key = app_settings.jwt_refresh_secret_key if is_refresh_endpoint else app_settings.jwt_secret_key
     try:
-        payload = jwt.decode(
-            token, secret_key, algorithms=[app_settings.jwt_algorithm]
-        )
-        token_data = TokenPayloadSchema(**payload)
-
-        # Если это не /refresh и токен не является access-токеном, выбрасываем ошибку
-        if not is_refresh_endpoint and secret_key == app_settings.jwt_refresh_secret_key:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        # Если это /refresh и токен не является refresh-токеном
-        if is_refresh_endpoint and secret_key == app_settings.jwt_secret_key:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type for refresh",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        if datetime.fromtimestamp(token_data.exp) < datetime.now():
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        # Тип токена определяется ключом подписи: на /refresh принимается только refresh токен,
+        # на остальных эндпоинтах только access токен
+        token_data = await decode_token_offloaded(token, is_refresh=is_refresh_endpoint)
     except (jwt.JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -90,7 +135,25 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user: UserSchema = await user_service.get_user_by_phone_number(phone_number=token_data.sub)
+    if token_data.exp < time.time():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        # Токены, выданные до нормализации номеров, содержат номер в исходном виде.
+        # Кеш пользователей ведется по нормализованному номеру, по нему же его и очищает репозиторий
+        phone_number = normalize_phone_number(token_data.sub)
+    except ValueError:
+        phone_number = token_data.sub
+
+    user: UserSchema | None = principal_cache.get(phone_number)
+    if user is not None:
+        return user
+
+    user = await user_service.get_user_by_phone_number(phone_number=phone_number)
 
     if not user:
         raise HTTPException(
@@ -98,4 +161,10 @@ async def get_current_user(
             detail="Could not find user",
         )
 
+    principal_cache.set(phone_number, user)
     return user
+
+
+def get_response_format(accept: Annotated[str | None, Header()] = None) -> ResponseFormat:
+    """Зависимость для выбора формата ответа с историей по заголовку Accept."""
+    return negotiate_response_format(accept)
@@ -103,6 +103,14 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
                 status=exc.status_code,
                 detail=[],
             )
+        case status.HTTP_429_TOO_MANY_REQUESTS:
+            problem_detail = ProblemDetail(
+                type="too_many_requests",
+                title="Слишком много запросов",
+                text=exc.detail or "Превышен лимит запросов, повторите позже.",
+                status=exc.status_code,
+                detail=[],
+            )
         case status.HTTP_500_INTERNAL_SERVER_ERROR:
             problem_detail = ProblemDetail(
                 type="internal_server_error",
@@ -111,10 +119,19 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
                 status=exc.status_code,
                 detail=[],
             )
+        case status.HTTP_503_SERVICE_UNAVAILABLE:
+            problem_detail = ProblemDetail(
+                type="service_unavailable",
+                title="Сервис недоступен",
+                text=exc.detail or "Сервис временно недоступен, повторите запрос позже.",
+                status=exc.status_code,
+                detail=[],
+            )
 
     return JSONResponse(
         content=problem_detail.model_dump(exclude_none=True),
         status_code=exc.status_code,
+        headers=exc.headers,
     )
 
 
@@ -193,6 +210,14 @@ async def starlette_http_exception_handler(
                 status=exc.status_code,
                 detail=[],
             )
+        case status.HTTP_429_TOO_MANY_REQUESTS:
+            problem_detail = ProblemDetail(
+                type="too_many_requests",
+                title="Слишком много запросов",
+                text=exc.detail or "Превышен лимит запросов, повторите позже.",
+                status=exc.status_code,
+                detail=[],
+            )
         case status.HTTP_500_INTERNAL_SERVER_ERROR:
             problem_detail = ProblemDetail(
                 type="internal_server_error",
@@ -201,8 +226,17 @@ async def starlette_http_exception_handler(
                 status=exc.status_code,
                 detail=[],
             )
+        case status.HTTP_503_SERVICE_UNAVAILABLE:
+            problem_detail = ProblemDetail(
+                type="service_unavailable",
+                title="Сервис недоступен",
+                text=exc.detail or "Сервис временно недоступен, повторите запрос позже.",
+                status=exc.status_code,
+                detail=[],
+            )
 
     return JSONResponse(
         content=problem_detail.model_dump(exclude_none=True),
         status_code=exc.status_code,
+        headers=exc.headers,
     )
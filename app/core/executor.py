@@ -0,0 +1,126 @@
+import asyncio
+import contextlib
+import functools
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Literal, TypeVar
+
+from core.config import get_app_settings
+from core.metrics import Histogram
+
+T = TypeVar("T")
+
+# Задержка цикла событий в секундах: от 1 мс, ниже которой цикл считается свободным, до 5 с
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class CpuExecutor:
+    """Пул для CPU работы, которая иначе блокировала бы цикл событий.
+
+    Небольшая работа выполняется на месте: переход в пул и обратно стоит десятки микросекунд,
+    а в пул процессов еще и сериализацию аргументов и результата. В пул уходит только работа,
+    размер которой не меньше порога. Для пула процессов функция и аргументы должны сериализоваться pickle,
+    поэтому функция должна быть объявлена на уровне модуля.
+    """
+
+    def __init__(self, kind: Literal["thread", "process"] = "thread", workers: int = 4) -> None:
+        self.kind = kind
+        self.workers = workers
+        self._executor: Executor | None = None
+        self.offloaded = 0
+        self.inline = 0
+        self.run_time = Histogram()
+
+    def _get_executor(self) -> Executor:
+        # Пул создается при первой задаче: процессы не запускаются в воркерах, которым они не понадобятся
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu")
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Выполнение func в пуле, время от постановки до результата попадает в run_time."""
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), functools.partial(func, *args, **kwargs),
+            )
+        finally:
+            self.offloaded += 1
+            self.run_time.observe(time.perf_counter() - started)
+
+    async def run_sized(self, size: int, threshold: int, func: Callable[..., T], *args, **kwargs) -> T:
+        """Выполнение func в пуле, если размер работы не меньше порога, иначе на месте."""
+        if size < threshold:
+            self.inline += 1
+            return func(*args, **kwargs)
+        return await self.run(func, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        """Остановка пула с ожиданием уже поставленных задач."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def snapshot(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "offloaded": self.offloaded,
+            "inline": self.inline,
+            "run_time": self.run_time.snapshot(),
+        }
+
+
+class LoopLagMonitor:
+    """Измерение задержки цикла событий.
+
+    Задача засыпает на interval секунд, все, что она проспала сверх interval, и есть время,
+    на которое цикл был занят чужой синхронной работой.
+    """
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self.interval = interval
+        self.lag = Histogram(buckets=LOOP_LAG_BUCKETS)
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, lag)
+            self.lag.observe(lag)
+
+    def snapshot(self) -> dict:
+        return {**self.lag.snapshot(), "max": self.max_lag}
+
+
+@lru_cache
+def get_cpu_executor() -> CpuExecutor:
+    """Пул для CPU работы, один на процесс."""
+    app_settings = get_app_settings()
+    return CpuExecutor(kind=app_settings.executor_kind, workers=app_settings.executor_workers)
+
+
+@lru_cache
+def get_loop_lag_monitor() -> LoopLagMonitor:
+    """Измеритель задержки цикла событий, один на процесс."""
+    return LoopLagMonitor(interval=get_app_settings().loop_lag_interval_seconds)
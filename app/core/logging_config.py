@@ -2,18 +2,22 @@ import logging
 
 from pythonjsonlogger import jsonlogger
 
+from core.worker import WorkerFilter
+
 
 def setup_json_logging() -> None:
     """Set up JSON logging."""
     logging.getLogger().handlers.clear()  # Очистка существующих обработчиков
 
     formatter = jsonlogger.JsonFormatter(
-        fmt="%(asctime)s %(levelname)s %(name)s %(message)s",
+        fmt="%(asctime)s %(levelname)s %(name)s %(worker)s %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
     log_handler = logging.StreamHandler()
     log_handler.setFormatter(formatter)
+    # При нескольких воркерах по полю worker видно, какой процесс записал сообщение
+    log_handler.addFilter(WorkerFilter())
 
     # Отключение наследования обработчиков для логгеров "uvicorn"
     logging.getLogger("uvicorn").propagate = False
@@ -0,0 +1,34 @@
+from bisect import bisect_left
+from collections.abc import Sequence
+
+# Границы корзин по умолчанию в секундах: от 1 мс до 10 с
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин.
+
+    Значение попадает в первую корзину, граница которой не меньше значения,
+    все, что больше последней границы, попадает в корзину +Inf.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Учет одного значения."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        """Накопительные значения по корзинам в формате le -> количество."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
@@ -0,0 +1,28 @@
+from functools import lru_cache
+
+# Регион для номеров без кода страны, например 89182773844
+DEFAULT_REGION = "RU"
+
+
+@lru_cache(maxsize=65_536)
+def normalize_phone_number(value: str) -> str:
+    """Номер телефона в формате E.164, например +79182773844.
+
+    Разбор номера дорогой, а одни и те же номера приходят на звонок, проверку кода и в токенах,
+    поэтому результаты кешируются. Невалидные номера не кешируются, так как исключение не сохраняется.
+    Библиотека phonenumbers с таблицами метаданных импортируется при первом разборе.
+
+    Raises
+    ------
+        ValueError: Номер не разбирается или не существует.
+
+    """
+    import phonenumbers
+
+    try:
+        phone_number = phonenumbers.parse(value, DEFAULT_REGION)
+    except phonenumbers.NumberParseException as ex:
+        raise ValueError("Invalid phone number format") from ex
+    if not phonenumbers.is_valid_number(phone_number):
+        raise ValueError("Invalid phone number")
+    return phonenumbers.format_number(phone_number, phonenumbers.PhoneNumberFormat.E164)
@@ -0,0 +1,85 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import Histogram
+
+
+class PoolMetrics:
+    """Счетчики пула соединений одного движка."""
+
+    def __init__(self) -> None:
+        self.checkout_latency = Histogram()
+        self.waiting = 0
+        self.wait_time_total = 0.0
+        self.timeouts = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который измеряет время ожидания свободного соединения."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        self.metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.waiting -= 1
+            self.metrics.wait_time_total += elapsed
+            self.metrics.checkout_latency.observe(elapsed)
+
+    def recreate(self) -> "InstrumentedAsyncAdaptedQueuePool":
+        # При dispose движка пул пересоздается, счетчики переносятся в новый пул
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подписка на события пула для подсчета выдачи, создания и инвалидации соединений."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):  # noqa: ARG001
+        engine.pool.metrics.checkouts += 1
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):  # noqa: ARG001
+        engine.pool.metrics.connects += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):  # noqa: ARG001
+        engine.pool.metrics.invalidations += 1
+
+
+def pool_snapshot(engine: AsyncEngine) -> dict:
+    """Текущее состояние пула и накопленные счетчики."""
+    pool = engine.pool
+    metrics: PoolMetrics = pool.metrics
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "waiting": metrics.waiting,
+        "checkouts": metrics.checkouts,
+        "connects": metrics.connects,
+        "invalidations": metrics.invalidations,
+        "timeouts": metrics.timeouts,
+        "wait_time_seconds_total": metrics.wait_time_total,
+        "checkout_latency": metrics.checkout_latency.snapshot(),
+    }
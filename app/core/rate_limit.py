@@ -0,0 +1,192 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+
+from core.cache import TTLCache
+from core.config import RateLimitPolicy, get_app_settings
+
+
+# Скользящее окно приближается двумя соседними фиксированными окнами: счетчик предыдущего окна
+# берется с весом, убывающим по мере продвижения текущего. Память на ключ постоянная.
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local window = math.floor(now / period)
+local state = redis.call('HMGET', KEYS[1], 'w', 'p', 'c')
+local w = tonumber(state[1]) or window
+local prev = tonumber(state[2]) or 0
+local curr = tonumber(state[3]) or 0
+if window == w + 1 then
+    prev = curr
+    curr = 0
+elseif window > w + 1 then
+    prev = 0
+    curr = 0
+end
+local elapsed = now - window * period
+if prev * (1 - elapsed / period) + curr + 1 > limit then
+    local wait
+    if curr + 1 <= limit and prev > 0 then
+        wait = period * (1 - (limit - curr - 1) / prev) - elapsed
+    else
+        wait = period - elapsed + math.max(period * (1 - (limit - 1) / curr), 0)
+    end
+    return math.max(math.ceil(wait * 1000), 1)
+end
+redis.call('HSET', KEYS[1], 'w', window, 'p', prev, 'c', curr + 1)
+redis.call('PEXPIRE', KEYS[1], math.ceil(period * 2000))
+return 0
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local rate = limit / period
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = limit
+else
+    tokens = math.min(limit, tokens + (now - tonumber(state[2])) * rate)
+end
+if tokens < 1 then
+    return math.max(math.ceil((1 - tokens) / rate * 1000), 1)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(period * 1000))
+return 0
+"""
+
+
+class RateLimitBackend(ABC):
+    """Хранилище счетчиков ограничения частоты запросов."""
+
+    @abstractmethod
+    async def hit(self, key: str, policy: RateLimitPolicy) -> float:
+        """Учет запроса по ключу, вернет 0 если запрос разрешен, иначе через сколько секунд повторить."""
+
+    async def close(self) -> None:
+        """Освобождение ресурсов хранилища."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Счетчики в памяти процесса, лимит действует отдельно в каждом воркере."""
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self._state = TTLCache(maxsize=maxsize, ttl=0)
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> float:
+        now = time.monotonic()
+        if policy.algorithm == "token_bucket":
+            return self._token_bucket(key, policy, now)
+        return self._sliding_window(key, policy, now)
+
+    def _sliding_window(self, key: str, policy: RateLimitPolicy, now: float) -> float:
+        limit, period = policy.limit, policy.period
+        window = math.floor(now / period)
+        w, prev, curr = self._state.get(key) or (window, 0, 0)
+        if window == w + 1:
+            prev, curr = curr, 0
+        elif window > w + 1:
+            prev, curr = 0, 0
+
+        elapsed = now - window * period
+        if prev * (1 - elapsed / period) + curr + 1 > limit:
+            if curr + 1 <= limit and prev > 0:
+                # Место освободится внутри текущего окна, когда вес предыдущего окна уменьшится
+                return period * (1 - (limit - curr - 1) / prev) - elapsed
+            # Текущее окно заполнено: ждать его конца и затем пока оно, став предыдущим, не потеряет вес
+            return period - elapsed + max(period * (1 - (limit - 1) / curr), 0)
+
+        self._state.set(key, (window, prev, curr + 1), ttl=period * 2)
+        return 0.0
+
+    def _token_bucket(self, key: str, policy: RateLimitPolicy, now: float) -> float:
+        limit, period = policy.limit, policy.period
+        rate = limit / period
+        state = self._state.get(key)
+        if state is None:
+            tokens = float(limit)
+        else:
+            tokens, updated_at = state
+            tokens = min(limit, tokens + (now - updated_at) * rate)
+
+        if tokens < 1:
+            return (1 - tokens) / rate
+
+        self._state.set(key, (tokens - 1, now), ttl=period)
+        return 0.0
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Счетчики в Redis, лимит общий для всех воркеров; каждая проверка это один вызов Lua скрипта."""
+
+    def __init__(self, url: str, key_prefix: str = "ratelimit:") -> None:
+        from redis.asyncio import Redis
+
+        self.key_prefix = key_prefix
+        self._redis = Redis.from_url(url)
+        self._scripts = {
+            "sliding_window": self._redis.register_script(SLIDING_WINDOW_SCRIPT),
+            "token_bucket": self._redis.register_script(TOKEN_BUCKET_SCRIPT),
+        }
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> float:
+        retry_after_ms = await self._scripts[policy.algorithm](
+            keys=[f"{self.key_prefix}{key}"], args=[policy.limit, policy.period],
+        )
+        return retry_after_ms / 1000
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class RateLimiter:
+    """Проверка запроса по всем политикам маршрута, например call:phone и call:ip."""
+
+    def __init__(self, backend: RateLimitBackend, policies: dict[str, RateLimitPolicy]) -> None:
+        self.backend = backend
+        self.policies = policies
+
+    async def check(self, route: str, **keys: str) -> float:
+        """Учет запроса, вернет 0 если он разрешен всеми политиками, иначе наибольшее время до повтора."""
+        retry_after = 0.0
+        for kind, value in keys.items():
+            policy_name = f"{route}:{kind}"
+            policy = self.policies.get(policy_name)
+            if policy is None:
+                continue
+            retry_after = max(retry_after, await self.backend.hit(f"{policy_name}:{value}", policy))
+        return retry_after
+
+
+@lru_cache
+def get_rate_limiter() -> RateLimiter:
+    """Ограничитель частоты запросов с хранилищем из настроек, один на процесс."""
+    app_settings = get_app_settings()
+    if app_settings.rate_limit_backend == "redis":
+        backend = RedisRateLimitBackend(url=app_settings.redis_url)
+    else:
+        backend = InMemoryRateLimitBackend(maxsize=app_settings.rate_limit_max_keys)
+    return RateLimiter(backend=backend, policies=app_settings.rate_limit_policies)
+
+
+async def enforce_rate_limit(route: str, phone_number: str, client_ip: str) -> None:
+    """Проверка лимитов маршрута по номеру телефона и IP, при превышении 429 с Retry-After."""
+    app_settings = get_app_settings()
+    if not app_settings.rate_limit_enabled:
+        return
+    retry_after = await get_rate_limiter().check(route, phone=phone_number, ip=client_ip)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много запросов, повторите позже.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
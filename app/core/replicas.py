@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.cache import TTLCache
+from core.config import Settings, get_app_settings
+
+app_settings: Settings = get_app_settings()
+
+logger = logging.getLogger("health_tracker")
+
+# Отставание реплики в секундах, если реплика догнала основную базу, то 0 даже при отсутствии записи.
+# Без WAL receiver реплика не получает изменений и равенство LSN ничего не значит, тогда запрос вернет NULL.
+# Строка в pg_stat_wal_receiver есть, пока процесс запущен, и видна без прав pg_read_all_stats
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+# Пользователи, которые недавно писали в основную базу: их чтения идут в основную базу,
+# пока реплики не догонят запись
+recent_writers = TTLCache(maxsize=app_settings.principal_cache_size, ttl=app_settings.replica_max_lag_seconds)
+
+
+class ReplicaRouter:
+    """Выбор реплики для чтения с учетом ее доступности и отставания.
+
+    Состояние реплик проверяется не чаще, чем раз в check_interval секунд в фоновой задаче,
+    запросы читают только последний результат и не ждут проверки. Ждет только первый запрос,
+    пока результата еще нет, и не дольше check_timeout.
+    """
+
+    def __init__(
+        self, engines: list[AsyncEngine], max_lag_seconds: float, check_interval: float, check_timeout: float = 1.0,
+    ) -> None:
+        self.engines = engines
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._healthy: list[AsyncEngine] = []
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self._refreshing: asyncio.Task | None = None
+        self._round_robin = itertools.count()
+
+    async def _probe(self, engine: AsyncEngine) -> float | None:
+        async with engine.connect() as conn:
+            return await conn.scalar(REPLICA_LAG_QUERY)
+
+    async def _is_healthy(self, engine: AsyncEngine) -> bool:
+        try:
+            # Зависшее соединение или запрос не должны держать проверку дольше таймаута
+            lag = await asyncio.wait_for(self._probe(engine), timeout=self.check_timeout)
+        except Exception as ex:  # noqa: BLE001
+            logger.warning(f"Replica {engine.url.host}:{engine.url.port} is unavailable: {ex!r}")
+            return False
+
+        if lag is None:
+            logger.warning(f"Replica {engine.url.host}:{engine.url.port} is not receiving WAL")
+            return False
+        if lag > self.max_lag_seconds:
+            logger.warning(f"Replica {engine.url.host}:{engine.url.port} lags behind by {lag:.1f}s")
+            return False
+        return True
+
+    async def refresh(self) -> None:
+        """Проверка всех реплик."""
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            checks = await asyncio.gather(*(self._is_healthy(engine) for engine in self.engines))
+            self._healthy = [engine for engine, healthy in zip(self.engines, checks) if healthy]
+            self._checked_at = time.monotonic()
+
+    def _refresh_in_background(self) -> None:
+        if self._refreshing is not None and not self._refreshing.done():
+            return
+        self._refreshing = asyncio.create_task(self.refresh())
+        self._refreshing.add_done_callback(self._refreshed)
+
+    def _refreshed(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Replica health check failed: %s", task.exception())
+
+    async def choose(self) -> AsyncEngine | None:
+        """Выбор здоровой реплики по кругу, если таких нет, то None и чтение идет в основную базу."""
+        if not self.engines:
+            return None
+        if self._checked_at == float("-inf"):
+            await self.refresh()
+        elif time.monotonic() - self._checked_at >= self.check_interval:
+            self._refresh_in_background()
+        if not self._healthy:
+            return None
+        return self._healthy[next(self._round_robin) % len(self._healthy)]
+
+
+    async def close(self) -> None:
+        """Отмена фоновой проверки при остановке приложения."""
+        if self._refreshing is not None:
+            self._refreshing.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._refreshing
+            self._refreshing = None
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+
+from core.config import Settings, get_app_settings
+
+app_settings: Settings = get_app_settings()
+logger = logging.getLogger("health_tracker")
+
+Loader = Callable[[], Awaitable[bytes | None]]
+
+
+def make_etag(content: bytes) -> str:
+    """Сильный ETag по содержимому ответа."""
+    return '"' + hashlib.blake2b(content, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match, сравнение слабое, как требует RFC 9110."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    """Сериализованный ответ, его ETag и время сохранения."""
+
+    content: bytes
+    etag: str
+    stored_at: float
+
+    @classmethod
+    def build(cls, content: bytes) -> "CachedResponse":
+        return cls(content=content, etag=make_etag(content), stored_at=time.monotonic())
+
+
+class ResponseCache:
+    """Кеш сериализованных ответов по пользователю, ограниченный суммарным размером в байтах.
+
+    У пользователя может быть несколько вариантов ответа (параметры запроса, формат), инвалидация удаляет все.
+    Ответ старше ttl еще stale_while_revalidate секунд отдается сразу и обновляется в фоне,
+    а если база недоступна, то старый ответ отдается еще stale_if_error секунд вместо ошибки.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        stale_while_revalidate: float = 0.0,
+        stale_if_error: float = 0.0,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self._data: OrderedDict[Hashable, dict[Hashable, CachedResponse]] = OrderedDict()
+        self._size = 0
+        # Поколение пользователя растет при его инвалидации, а эпоха при полной очистке:
+        # ответ, загрузка которого началась раньше, не сохраняется. Поколения хранятся
+        # только для пользователей с незавершенной загрузкой, чтобы словарь не рос со временем
+        self._epoch = 0
+        self._generations: dict[Hashable, int] = {}
+        self._loads_in_flight: dict[Hashable, int] = {}
+        self._revalidating: dict[tuple[Hashable, Hashable], asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.stale_errors = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable, variant: Hashable) -> CachedResponse | None:
+        variants = self._data.get(key)
+        if variants is None:
+            return None
+        self._data.move_to_end(key)
+        return variants.get(variant)
+
+    def set(self, key: Hashable, variant: Hashable, entry: CachedResponse) -> None:
+        """Сохранение ответа, при превышении размера вытесняются давно не запрошенные пользователи."""
+        if len(entry.content) > self.max_bytes:
+            return
+        variants = self._data.setdefault(key, {})
+        previous = variants.get(variant)
+        if previous is not None:
+            self._size -= len(previous.content)
+        variants[variant] = entry
+        self._size += len(entry.content)
+        self._data.move_to_end(key)
+
+        while self._size > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self._size -= sum(len(entry.content) for entry in evicted.values())
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаление всех вариантов ответа пользователя."""
+        if key in self._loads_in_flight:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        variants = self._data.pop(key, None)
+        if variants is not None:
+            self._size -= sum(len(entry.content) for entry in variants.values())
+
+    def clear(self) -> None:
+        """Полная очистка кеша."""
+        self._epoch += 1
+        self._data.clear()
+        self._size = 0
+
+    async def get_or_load(
+        self, key: Hashable, variant: Hashable, loader: Loader, revalidator: Loader,
+    ) -> CachedResponse | None:
+        """Ответ из кеша или из loader.
+
+        revalidator обновляет устаревший ответ в фоне, уже после завершения запроса,
+        поэтому не должен зависеть от сессии текущего запроса.
+        """
+        entry = self._lookup(key, variant)
+        age = time.monotonic() - entry.stored_at if entry is not None else None
+        if age is not None and age < self.ttl:
+            self.hits += 1
+            return entry
+        if age is not None and age < self.ttl + self.stale_while_revalidate:
+            self.stale_hits += 1
+            self._revalidate(key, variant, revalidator)
+            return entry
+
+        self.misses += 1
+        try:
+            return await self._load(key, variant, loader)
+        except Exception:
+            if age is not None and age < self.ttl + self.stale_if_error:
+                self.stale_errors += 1
+                logger.exception("Serving stale response after load error")
+                return entry
+            raise
+
+    async def _load(self, key: Hashable, variant: Hashable, loader: Loader) -> CachedResponse | None:
+        generation = (self._epoch, self._generations.get(key, 0))
+        self._loads_in_flight[key] = self._loads_in_flight.get(key, 0) + 1
+        try:
+            content = await loader()
+            if content is None:
+                return None
+            entry = CachedResponse.build(content)
+            if generation == (self._epoch, self._generations.get(key, 0)):
+                self.set(key, variant, entry)
+            return entry
+        finally:
+            self._loads_in_flight[key] -= 1
+            if not self._loads_in_flight[key]:
+                del self._loads_in_flight[key]
+                self._generations.pop(key, None)
+
+    def _revalidate(self, key: Hashable, variant: Hashable, revalidator: Loader) -> None:
+        if (key, variant) in self._revalidating:
+            return
+        task = asyncio.create_task(self._load(key, variant, revalidator))
+        self._revalidating[(key, variant)] = task
+        task.add_done_callback(lambda done: self._revalidated(key, variant, done))
+
+    def _revalidated(self, key: Hashable, variant: Hashable, task: asyncio.Task) -> None:
+        self._revalidating.pop((key, variant), None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background revalidation failed: %s", task.exception())
+
+    def snapshot(self) -> dict:
+        """Счетчики и текущий размер кеша."""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "stale_errors": self.stale_errors,
+            "evictions": self.evictions,
+            "entries": sum(len(variants) for variants in self._data.values()),
+            "bytes": self._size,
+        }
+
+
+# Ответы /user/me по номеру телефона, инвалидируются при любой записи данных пользователя
+me_response_cache = ResponseCache(
+    max_bytes=app_settings.me_cache_max_bytes,
+    ttl=app_settings.me_cache_ttl_seconds,
+    stale_while_revalidate=app_settings.me_cache_stale_while_revalidate_seconds,
+    stale_if_error=app_settings.me_cache_stale_if_error_seconds,
+)
@@ -0,0 +1,81 @@
+import hashlib
+import time
+
+from jose import jwt
+
+from core.cache import TTLCache
+from core.config import Settings, get_app_settings
+from core.executor import get_cpu_executor
+from schemas.user import TokenPayloadSchema
+
+app_settings: Settings = get_app_settings()
+
+# Кеш проверенных токенов, запись живет до истечения exp самого токена
+token_cache = TTLCache(maxsize=app_settings.token_cache_size, ttl=0)
+
+
+def _cache_key(token: str, is_refresh: bool) -> tuple[bool, bytes]:
+    return is_refresh, hashlib.sha256(token.encode()).digest()
+
+
+def verify_signature(token: str, is_refresh: bool) -> dict:
+    """Проверка подписи и срока токена, объявлена на уровне модуля, чтобы выполняться и в пуле процессов.
+
+    Raises
+    ------
+        jwt.JWTError: Подпись неверна или токен истек.
+
+    """
+    secret_key = app_settings.jwt_refresh_secret_key if is_refresh else app_settings.jwt_secret_key
+    return jwt.decode(token, secret_key, algorithms=[app_settings.jwt_algorithm])
+
+
+def decode_token(token: str, is_refresh: bool, use_cache: bool = True) -> TokenPayloadSchema:
+    """Проверка подписи токена и получение его нагрузки.
+
+    Access и refresh токены подписываются разными ключами и хранятся в кеше
+    под разными ключами, поэтому refresh токен никогда не пройдет как access и наоборот.
+
+    Raises
+    ------
+        jwt.JWTError: Подпись неверна или токен истек.
+        ValidationError: Нагрузка токена не соответствует схеме.
+
+    """
+    cache_key = _cache_key(token, is_refresh)
+    if use_cache:
+        token_data: TokenPayloadSchema | None = token_cache.get(cache_key)
+        if token_data is not None:
+            return token_data
+
+    token_data = TokenPayloadSchema(**verify_signature(token, is_refresh))
+
+    if use_cache:
+        token_cache.set(cache_key, token_data, ttl=token_data.exp - time.time())
+
+    return token_data
+
+
+async def decode_token_offloaded(token: str, is_refresh: bool) -> TokenPayloadSchema:
+    """То же, что decode_token с кешем, но при промахе кеша подпись проверяется в пуле, если включен offload_jwt.
+
+    Кеш читается и пополняется только в цикле событий, в пул уходит одна проверка подписи.
+
+    Raises
+    ------
+        jwt.JWTError: Подпись неверна или токен истек.
+        ValidationError: Нагрузка токена не соответствует схеме.
+
+    """
+    cache_key = _cache_key(token, is_refresh)
+    token_data: TokenPayloadSchema | None = token_cache.get(cache_key)
+    if token_data is not None:
+        return token_data
+
+    if app_settings.offload_jwt:
+        payload = await get_cpu_executor().run(verify_signature, token, is_refresh)
+    else:
+        payload = verify_signature(token, is_refresh)
+    token_data = TokenPayloadSchema(**payload)
+    token_cache.set(cache_key, token_data, ttl=token_data.exp - time.time())
+    return token_data
@@ -0,0 +1,111 @@
+import asyncio
+import contextlib
+import logging
+import time
+from enum import StrEnum
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from core.phone import normalize_phone_number
+from integrations.smsru.client import SmsRuClient
+from models.user import StepRecord, WaterIntakeRecord, WeightRecord
+from repositories.user_repository import LoadProfile, UserRepository
+
+logger = logging.getLogger("health_tracker")
+
+# Номер, которого нет в базе: запросы прогрева проходят по тем же индексам, что и настоящие, и ничего не находят
+WARMUP_PHONE_NUMBER = "+70000000000"
+
+
+class LifecycleState(StrEnum):
+    """Стадии жизни процесса приложения."""
+
+    STARTING = "starting"
+    READY = "ready"
+    DRAINING = "draining"
+
+
+class Lifecycle:
+    """Стадия процесса для readiness: готов принимать запросы только после прогрева и до начала остановки."""
+
+    def __init__(self) -> None:
+        self.state = LifecycleState.STARTING
+        self.warmup_seconds: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == LifecycleState.READY
+
+
+lifecycle = Lifecycle()
+
+
+async def _prime_statements(session: AsyncSession) -> None:
+    """Выполнение горячих запросов UserRepository на соединении сессии.
+
+    asyncpg при этом загружает кодеки типов и подготавливает запросы в кеше этого соединения.
+    """
+    repository = UserRepository(db_session=session)
+    await repository.get_user_by_phone_number(phone_number=WARMUP_PHONE_NUMBER)
+    await repository.get_user_by_phone_number(phone_number=WARMUP_PHONE_NUMBER, profile=LoadProfile.PROFILE)
+    await repository.get_user_history_rows(phone_number=WARMUP_PHONE_NUMBER)
+    await repository.get_changes_since(phone_number=WARMUP_PHONE_NUMBER, after_seq=0)
+    await repository.is_username_taken(username="warmup")
+    for record_model in (StepRecord, WeightRecord, WaterIntakeRecord):
+        await repository.get_records_page(
+            record_model=record_model,
+            phone_number=WARMUP_PHONE_NUMBER,
+            date_from=None,
+            date_to=None,
+            after=None,
+            limit=1,
+        )
+
+
+async def _prime_connection(connection: AsyncConnection) -> None:
+    async with AsyncSession(bind=connection) as session:
+        await _prime_statements(session)
+
+
+async def warm_up_engine(engine: AsyncEngine, connections: int) -> None:
+    """Открытие connections соединений пула одновременно и прогрев каждого.
+
+    Соединения открываются все сразу, иначе пул отдавал бы одно и то же соединение,
+    после прогрева они возвращаются в пул и остаются открытыми.
+    """
+    opened = await asyncio.gather(
+        *(engine.connect().start() for _ in range(connections)), return_exceptions=True,
+    )
+    connected = [connection for connection in opened if isinstance(connection, AsyncConnection)]
+    try:
+        errors = [error for error in opened if isinstance(error, BaseException)]
+        if errors:
+            raise errors[0]
+        await asyncio.gather(*(_prime_connection(connection) for connection in connected))
+    finally:
+        await asyncio.gather(*(connection.close() for connection in connected))
+
+
+async def warm_up(engines: list[AsyncEngine], connections: int, smsru_client: SmsRuClient, timeout: float) -> None:
+    """Прогрев разбора номеров, пулов всех движков и HTTP клиента, после него процесс помечается готовым.
+
+    Ошибка прогрева не мешает старту: запросы откроют соединения сами, а недоступность базы
+    покажет проверка readiness.
+    """
+    started = time.perf_counter()
+    # phonenumbers и метаданные региона загружаются здесь, а не на первом запросе звонка
+    with contextlib.suppress(ValueError):
+        normalize_phone_number(WARMUP_PHONE_NUMBER)
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                *(warm_up_engine(engine, connections) for engine in engines),
+                smsru_client.warm_up(),
+            ),
+            timeout=timeout,
+        )
+    except Exception:
+        logger.exception("Warm-up failed, continuing with cold pools")
+    lifecycle.warmup_seconds = time.perf_counter() - started
+    lifecycle.state = LifecycleState.READY
+    logger.info("Warm-up finished in %.3f s", lifecycle.warmup_seconds)
@@ -0,0 +1,16 @@
+import logging
+import os
+import socket
+
+
+def worker_id() -> str:
+    """Идентификатор процесса-воркера для логов и метрик: хост и pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkerFilter(logging.Filter):
+    """Добавляет в каждую запись лога поле worker с идентификатором воркера."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.worker = worker_id()
+        return True
@@ -1,8 +1,16 @@
 from fastapi import APIRouter
 
-from endpoints import health, user
+from core.config import get_app_settings
+from endpoints import health, internal, user
 
-routers = APIRouter()
 
-routers.include_router(health.router)
-routers.include_router(user.router)
+def get_routers() -> list[APIRouter]:
+    """Роутеры приложения.
+
+    Подключаются к приложению напрямую, а не через общий APIRouter: include_router заново собирает
+    каждый маршрут, и промежуточный роутер удваивал эту работу при старте.
+    """
+    routers = [health.router, user.router]
+    if get_app_settings().internal_metrics_enabled:
+        routers.append(internal.router)
+    return routers
@@ -1,7 +1,8 @@
 from typing import Annotated
 
 from core.dependencies import get_db
-from fastapi import APIRouter, Depends, status
+from core.warmup import lifecycle
+from fastapi import APIRouter, Depends, Response, status
 from schemas.liveness import LivenessReadinessSchema, LivenessReadinessStatus
 from schemas.problem import ProblemDetail
 from sqlalchemy import select
@@ -38,11 +39,21 @@ async def liveness() -> LivenessReadinessSchema:
             "model": LivenessReadinessSchema,
             "description": "Статус доступности к базе данных.",
         },
+        503: {
+            "model": LivenessReadinessSchema,
+            "description": "Приложение еще прогревается или уже останавливается.",
+        },
         500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
     },
 )
-async def readiness(db: Annotated[Session, Depends(get_db)]) -> LivenessReadinessSchema:
-    """Эндпоинт для проверки на читаемость из базы данных."""
+async def readiness(response: Response, db: Annotated[Session, Depends(get_db)]) -> LivenessReadinessSchema:
+    """Эндпоинт для проверки на читаемость из базы данных.
+
+    До окончания прогрева и после начала остановки отвечает 503, чтобы балансировщик не слал запросы.
+    """
+    if not lifecycle.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return LivenessReadinessSchema(status=LivenessReadinessStatus(lifecycle.state))
     try:
         # нельзя делать запросы в бд из эндпоинта, такие вещи происходят на самом нижнем слое в репозитории
         # здесь только для исключения так как эндпоинт просто проверяет доступность бд
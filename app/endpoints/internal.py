@@ -0,0 +1,41 @@
+from core.dependencies import admission_controller, async_engine, replica_engines
+from core.executor import get_cpu_executor, get_loop_lag_monitor
+from core.pool_metrics import pool_snapshot
+from core.response_cache import me_response_cache
+from core.worker import worker_id
+from fastapi import APIRouter, status
+from integrations.smsru.client import get_smsru_client
+from schemas.metrics import MetricsSchema
+from schemas.problem import ProblemDetail
+
+router = APIRouter(prefix="/internal", tags=["Внутренние метрики"])
+
+
+@router.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    response_model=MetricsSchema,
+    summary="Метрики процесса для настройки пулов соединений.",
+    responses={
+        200: {
+            "model": MetricsSchema,
+            "description": "Метрики успешно получены.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def get_metrics() -> MetricsSchema:
+    """Эндпоинт для получения метрик пулов, исходящих запросов и задержки цикла событий текущего процесса."""
+    pools = {
+        f"{engine.url.host}:{engine.url.port}": pool_snapshot(engine)
+        for engine in (async_engine, *replica_engines)
+    }
+    return MetricsSchema(
+        worker=worker_id(),
+        pools=pools,
+        http_clients={"smsru": get_smsru_client().latency.snapshot()},
+        admission=admission_controller.snapshot(),
+        response_caches={"user_me": me_response_cache.snapshot()},
+        executor=get_cpu_executor().snapshot(),
+        loop_lag=get_loop_lag_monitor().snapshot(),
+    )
@@ -1,23 +1,80 @@
+from collections.abc import Awaitable
+from datetime import datetime
 from typing import Annotated
 
-from core.dependencies import get_user_service, get_current_user, oauth_scheme
-from fastapi import APIRouter, Depends, status, HTTPException
+from core.dependencies import (
+    async_session,
+    get_current_user,
+    get_response_format,
+    get_user_service,
+    oauth_scheme,
+    open_read_session,
+)
+from core.config import get_app_settings
+from core.rate_limit import enforce_rate_limit
+from core.response_cache import CachedResponse, etag_matches, me_response_cache
+from fastapi import APIRouter, Depends, Header, Query, Request, status, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from schemas.user import (
     UserCallSchema,
     UserCallResponseSchema,
     UserVerifySchema,
     UserVerifyResponseSchema,
     UserSchema,
+    UsernameAvailabilitySchema,
     UserDetailSchema,
+    UserSyncSchema,
     UserUpdateSchema,
     TokenResponseSchema,
+    UserStepsPageSchema,
+    UserWeightPageSchema,
+    UserWaterPageSchema,
+    UserRecordsBatchSchema,
+    UserRecordsBatchResponseSchema,
+    ExportFormat,
+    CallJobStatusSchema,
+    ResponseFormat,
 )
 from schemas.problem import ProblemDetail
 
-from services.user_service import UserService
+from services.call_dispatcher import CallDispatchUnavailableError
+from services.serialization import render_records_page
+from services.user_service import UserService, UsernameTakenError, normalize_username
 
 router = APIRouter(prefix="/user", tags=["Пользователи."])
 
+DateFromQuery = Annotated[datetime | None, Query(alias="from", description="Начало периода (включительно).")]
+DateToQuery = Annotated[datetime | None, Query(alias="to", description="Конец периода (не включительно).")]
+CursorQuery = Annotated[str | None, Query(description="Курсор следующей страницы из next_cursor.")]
+LimitQuery = Annotated[int, Query(ge=1, le=1000, description="Максимальное количество записей на странице.")]
+
+
+# Колоночные форматы истории, выбираются заголовком Accept, без него ответ в JSON
+COLUMNAR_CONTENT = {ResponseFormat.COLUMNAR_JSON.value: {}, ResponseFormat.COLUMNAR_MSGPACK.value: {}}
+
+
+def _page_response(
+    page: UserStepsPageSchema | UserWeightPageSchema | UserWaterPageSchema,
+    value_field: str,
+    response: Response,
+    response_format: ResponseFormat,
+) -> UserStepsPageSchema | UserWeightPageSchema | UserWaterPageSchema | Response:
+    """Страница истории в формате из Accept, JSON отдается через response_model."""
+    if response_format == ResponseFormat.JSON:
+        response.headers["Vary"] = "Accept"
+        return page
+    rows = [(getattr(item, value_field), item.recorded_at) for item in page.items]
+    return Response(
+        content=render_records_page(rows, page.next_cursor, response_format),
+        media_type=response_format.value,
+        headers={"Vary": "Accept"},
+    )
+
+
+def _client_ip(request: Request) -> str:
+    """IP клиента для ограничения частоты запросов, за прокси нужен запуск uvicorn с --proxy-headers."""
+    return request.client.host if request.client else "unknown"
+
 
 @router.post(
     "/call",
@@ -33,16 +90,58 @@ router = APIRouter(prefix="/user", tags=["Пользователи."])
             "model": ProblemDetail,
             "description": "Неправильно набран номер.",
         },
+        429: {"description": "Слишком много запросов на звонок.", "model": ProblemDetail},
         500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+        503: {"description": "Сервис звонков временно недоступен.", "model": ProblemDetail},
     },
 )
 async def make_phone_call(
+    request: Request,
     user_service: Annotated[UserService, Depends(get_user_service)],
     phone_to_call: UserCallSchema,
 ) -> UserCallResponseSchema:
-    """Эндпоинт для запроса на отправку на номер телефона."""
-    result: bool = await user_service.phone_call(phone_number=phone_to_call.phone_number)
-    return UserCallResponseSchema(success=result)
+    """Эндпоинт для запроса на отправку на номер телефона.
+
+    Звонок ставится в очередь, статус можно узнать по job_id.
+    """
+    await enforce_rate_limit("call", phone_number=phone_to_call.phone_number, client_ip=_client_ip(request))
+    try:
+        job_id = await user_service.phone_call(phone_number=phone_to_call.phone_number)
+    except CallDispatchUnavailableError as ex:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(ex),
+            headers={"Retry-After": str(ex.retry_after)},
+        )
+    return UserCallResponseSchema(success=True, job_id=job_id)
+
+
+@router.get(
+    "/call/{job_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=CallJobStatusSchema,
+    summary="Статус запроса на звонок.",
+    responses={
+        200: {
+            "model": CallJobStatusSchema,
+            "description": "Статус звонка.",
+        },
+        404: {
+            "model": ProblemDetail,
+            "description": "Задача не найдена или устарела.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def get_phone_call_status(
+    user_service: Annotated[UserService, Depends(get_user_service)],
+    job_id: str,
+) -> CallJobStatusSchema:
+    """Эндпоинт для получения статуса звонка."""
+    job_status = await user_service.get_call_status(job_id=job_id)
+    if job_status is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена.")
+    return job_status
 
 
 @router.post(
@@ -59,14 +158,17 @@ async def make_phone_call(
             "model": ProblemDetail,
             "description": "Код неверен или истек.",
         },
+        429: {"description": "Слишком много попыток ввода кода.", "model": ProblemDetail},
         500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
     },
 )
 async def verify_phone_call(
+    request: Request,
     user_service: Annotated[UserService, Depends(get_user_service)],
     verification_data: UserVerifySchema,
 ) -> UserVerifyResponseSchema:
     """Эндпоинт для проверки кода подтверждения."""
+    await enforce_rate_limit("verify", phone_number=verification_data.phone_number, client_ip=_client_ip(request))
     user_verify: UserVerifyResponseSchema = await user_service.verify_code(
         phone_number=verification_data.phone_number,
         code=verification_data.code
@@ -117,20 +219,217 @@ async def refresh_access_token(
     responses={
         200: {
             "model": UserDetailSchema,
-            "description": "Информация успешно получена.",
+            "description": "Информация успешно получена, с Accept колоночного формата история в виде массивов.",
+            "content": COLUMNAR_CONTENT,
         },
+        304: {"description": "Ответ не изменился с ETag из If-None-Match."},
         401: {
             "model": ProblemDetail,
             "description": "Пользователь не авторизован.",
         },
+        404: {
+            "model": ProblemDetail,
+            "description": "Пользователь не найден.",
+        },
         500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
     },
 )
 async def get_user_details(
+    days: Annotated[int | None, Query(ge=1, description="Вернуть историю только за последние N дней.")] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
     user: UserSchema = Depends(get_current_user),
     user_service: UserService = Depends(get_user_service),
-) -> UserDetailSchema:
-    return await user_service.get_full_info_about_user(phone_number=user.phone_number)
+    response_format: ResponseFormat = Depends(get_response_format),
+) -> Response:
+    # Ответ уже сериализован по UserDetailSchema, повторная валидация через response_model не нужна
+    def load(service: UserService) -> Awaitable[bytes | None]:
+        return service.get_full_info_about_user_content(
+            phone_number=user.phone_number, days=days, response_format=response_format,
+        )
+
+    async def revalidate() -> bytes | None:
+        # Фоновое обновление идет после ответа, когда сессии запроса уже закрыты
+        async with async_session() as db, await open_read_session() as read_db:
+            return await load(UserService(db_session=db, read_session=read_db))
+
+    if get_app_settings().me_cache_enabled:
+        cached = await me_response_cache.get_or_load(
+            user.phone_number, (days, response_format), loader=lambda: load(user_service), revalidator=revalidate,
+        )
+    else:
+        content = await load(user_service)
+        cached = CachedResponse.build(content) if content is not None else None
+    if cached is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден.")
+
+    headers = {"Vary": "Accept", "ETag": cached.etag}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.content, media_type=response_format.value, headers=headers)
+
+
+@router.get(
+    "/sync",
+    status_code=status.HTTP_200_OK,
+    response_model=UserSyncSchema,
+    summary="Получение записей истории, добавленных после курсора синхронизации.",
+    responses={
+        200: {
+            "model": UserSyncSchema,
+            "description": "Новые записи и курсор для следующей синхронизации.",
+        },
+        401: {
+            "model": ProblemDetail,
+            "description": "Пользователь не авторизован.",
+        },
+        404: {
+            "model": ProblemDetail,
+            "description": "Пользователь не найден.",
+        },
+        422: {
+            "model": ProblemDetail,
+            "description": "Неверный курсор.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def sync_user_history(
+    cursor: Annotated[
+        str | None, Query(description="Курсор из предыдущей синхронизации, без него возвращается вся история.")
+    ] = None,
+    user: UserSchema = Depends(get_current_user),
+    user_service: UserService = Depends(get_user_service),
+) -> UserSyncSchema:
+    try:
+        changes = await user_service.get_changes(phone_number=user.phone_number, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Неверный курсор.")
+    if changes is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден.")
+    return changes
+
+
+@router.get(
+    "/steps",
+    status_code=status.HTTP_200_OK,
+    response_model=UserStepsPageSchema,
+    summary="Получение истории шагов за период.",
+    responses={
+        200: {
+            "model": UserStepsPageSchema,
+            "description": "Страница истории успешно получена.",
+            "content": COLUMNAR_CONTENT,
+        },
+        401: {
+            "model": ProblemDetail,
+            "description": "Пользователь не авторизован.",
+        },
+        422: {
+            "model": ProblemDetail,
+            "description": "Неверные параметры или курсор.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def get_user_steps(
+    response: Response,
+    date_from: DateFromQuery = None,
+    date_to: DateToQuery = None,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = 100,
+    user: UserSchema = Depends(get_current_user),
+    user_service: UserService = Depends(get_user_service),
+    response_format: ResponseFormat = Depends(get_response_format),
+) -> UserStepsPageSchema | Response:
+    try:
+        page = await user_service.get_steps_page(
+            phone_number=user.phone_number, date_from=date_from, date_to=date_to, cursor=cursor, limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Неверный курсор.")
+    return _page_response(page, "steps_count", response, response_format)
+
+
+@router.get(
+    "/weight",
+    status_code=status.HTTP_200_OK,
+    response_model=UserWeightPageSchema,
+    summary="Получение истории веса за период.",
+    responses={
+        200: {
+            "model": UserWeightPageSchema,
+            "description": "Страница истории успешно получена.",
+            "content": COLUMNAR_CONTENT,
+        },
+        401: {
+            "model": ProblemDetail,
+            "description": "Пользователь не авторизован.",
+        },
+        422: {
+            "model": ProblemDetail,
+            "description": "Неверные параметры или курсор.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def get_user_weight(
+    response: Response,
+    date_from: DateFromQuery = None,
+    date_to: DateToQuery = None,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = 100,
+    user: UserSchema = Depends(get_current_user),
+    user_service: UserService = Depends(get_user_service),
+    response_format: ResponseFormat = Depends(get_response_format),
+) -> UserWeightPageSchema | Response:
+    try:
+        page = await user_service.get_weight_page(
+            phone_number=user.phone_number, date_from=date_from, date_to=date_to, cursor=cursor, limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Неверный курсор.")
+    return _page_response(page, "weight", response, response_format)
+
+
+@router.get(
+    "/water",
+    status_code=status.HTTP_200_OK,
+    response_model=UserWaterPageSchema,
+    summary="Получение истории выпитой воды за период.",
+    responses={
+        200: {
+            "model": UserWaterPageSchema,
+            "description": "Страница истории успешно получена.",
+            "content": COLUMNAR_CONTENT,
+        },
+        401: {
+            "model": ProblemDetail,
+            "description": "Пользователь не авторизован.",
+        },
+        422: {
+            "model": ProblemDetail,
+            "description": "Неверные параметры или курсор.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def get_user_water(
+    response: Response,
+    date_from: DateFromQuery = None,
+    date_to: DateToQuery = None,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = 100,
+    user: UserSchema = Depends(get_current_user),
+    user_service: UserService = Depends(get_user_service),
+    response_format: ResponseFormat = Depends(get_response_format),
+) -> UserWaterPageSchema | Response:
+    try:
+        page = await user_service.get_water_page(
+            phone_number=user.phone_number, date_from=date_from, date_to=date_to, cursor=cursor, limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Неверный курсор.")
+    return _page_response(page, "water_amount", response, response_format)
 
 
 @router.put(
@@ -141,12 +440,16 @@ async def get_user_details(
     responses={
         200: {
             "model": UserDetailSchema,
-            "description": "Поля успешно обновлены.",
+            "description": "Поля успешно обновлены, в ответе только добавленные записи.",
         },
         401: {
             "model": ProblemDetail,
             "description": "Пользователь не авторизован.",
         },
+        422: {
+            "model": ProblemDetail,
+            "description": "Неверные данные или никнейм уже занят.",
+        },
         500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
     },
 )
@@ -155,11 +458,105 @@ async def update_user_info(
     user: UserSchema = Depends(get_current_user),
     user_service: UserService = Depends(get_user_service),
 ) -> UserDetailSchema:
-    if user_update_data.username:
-        is_exists: bool = await user_service.check_if_username_exists(username=user_update_data.username)
-        if is_exists:
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Пользователь с таким username уже существует.",
-            )
-    return await user_service.update_user_info(phone_number=user.phone_number, data=user_update_data)
+    try:
+        return await user_service.update_user_info(phone_number=user.phone_number, data=user_update_data)
+    except UsernameTakenError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Пользователь с таким username уже существует.",
+        )
+
+
+@router.get(
+    "/username/availability",
+    status_code=status.HTTP_200_OK,
+    response_model=UsernameAvailabilitySchema,
+    summary="Проверка, свободен ли никнейм.",
+    responses={
+        200: {
+            "model": UsernameAvailabilitySchema,
+            "description": "Никнейм проверен, свой никнейм пользователя считается свободным.",
+        },
+        401: {
+            "model": ProblemDetail,
+            "description": "Пользователь не авторизован.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def check_username_availability(
+    username: Annotated[str, Query(min_length=1, description="Никнейм для проверки.")],
+    user: UserSchema = Depends(get_current_user),
+    user_service: UserService = Depends(get_user_service),
+) -> UsernameAvailabilitySchema:
+    if user.username is not None and normalize_username(user.username) == normalize_username(username):
+        return UsernameAvailabilitySchema(username=username, available=True)
+    is_taken = await user_service.check_if_username_exists(username=username)
+    return UsernameAvailabilitySchema(username=username, available=not is_taken)
+
+
+@router.post(
+    "/records/batch",
+    status_code=status.HTTP_200_OK,
+    response_model=UserRecordsBatchResponseSchema,
+    summary="Пакетная загрузка записей о шагах, весе и воде.",
+    responses={
+        200: {
+            "model": UserRecordsBatchResponseSchema,
+            "description": "Пакет обработан, невалидные записи отклонены.",
+        },
+        401: {
+            "model": ProblemDetail,
+            "description": "Пользователь не авторизован.",
+        },
+        422: {
+            "model": ProblemDetail,
+            "description": "Пакет превышает допустимый размер.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def add_records_batch(
+    batch: UserRecordsBatchSchema,
+    user: UserSchema = Depends(get_current_user),
+    user_service: UserService = Depends(get_user_service),
+) -> UserRecordsBatchResponseSchema:
+    return await user_service.add_records_batch(phone_number=user.phone_number, records=batch.records)
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    summary="Выгрузка всей истории пользователя в NDJSON или CSV.",
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+            "description": "История выгружается потоком.",
+        },
+        401: {
+            "model": ProblemDetail,
+            "description": "Пользователь не авторизован.",
+        },
+        500: {"description": "Внутренняя ошибка сервера.", "model": ProblemDetail},
+    },
+)
+async def export_user_history(
+    export_format: Annotated[ExportFormat, Query(alias="format", description="Формат выгрузки.")] = ExportFormat.NDJSON,
+    user: UserSchema = Depends(get_current_user),
+) -> StreamingResponse:
+    async def content():
+        # Сессия открывается внутри генератора, так как зависимость get_db закрывается
+        # до того, как будет отправлено тело потокового ответа
+        async with async_session() as db, await open_read_session() as read_db:
+            async for chunk in UserService(db_session=db, read_session=read_db).export_history(
+                phone_number=user.phone_number, export_format=export_format,
+            ):
+                yield chunk
+
+    media_type = "text/csv" if export_format == ExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="history.{export_format}"'},
+    )
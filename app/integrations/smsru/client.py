@@ -1,56 +1,136 @@
-import aiohttp
-from aiohttp import (
-    ClientConnectionError,
-    ServerConnectionError,
-    ServerDisconnectedError,
-    ServerTimeoutError,
-)
-from core.config import Settings, get_app_settings
+import asyncio
+from typing import TYPE_CHECKING
+
+from core.config import get_app_settings
+from core.metrics import Histogram
+from integrations.smsru.exceptions import SmsRuRejectedError, SmsRuUnavailableError
+from functools import lru_cache
 import json
 import string
+import time
 from random import choice
 
-app_settings: Settings = get_app_settings()
+if TYPE_CHECKING:
+    import aiohttp
 
 
 class SmsRuClient:
-    """Клиент для работы с сервисом sms ru."""
+    """Клиент для работы с сервисом sms ru.
+
+    Держит одну сессию aiohttp с пулом keep-alive соединений на весь процесс,
+    сессия открывается при старте приложения и закрывается при остановке.
+    aiohttp импортируется при открытии сессии, а не при импорте приложения.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        api_id: str,
+        debug: bool = False,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+    ) -> None:
+        self.api_url = api_url
+        self.api_id = api_id
+        self.debug = debug
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.latency = Histogram()
+        self._session: "aiohttp.ClientSession | None" = None
+
+    async def start(self) -> None:
+        """Открытие сессии с пулом соединений."""
+        if self._session is not None and not self._session.closed:
+            return
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self) -> None:
+        """Закрытие сессии и всех соединений."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def warm_up(self) -> None:
+        """Установка соединения с sms ru заранее: DNS, TCP и TLS, соединение остается в пуле keep-alive.
+
+        Отправляется HEAD без параметров, звонок при этом не выполняется.
+        """
+        if self.debug:
+            return
+        await self.start()
+        async with self._session.head(self.api_url):
+            pass
 
     async def __aenter__(self):
-        self._session = aiohttp.ClientSession()
+        await self.start()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        await self._session.close()
+        await self.close()
 
     async def make_phone_call(self, phone_number: str) -> str:
-        if app_settings.debug:
+        if self.debug:
             chars = string.digits
             return ''.join(choice(chars) for _ in range(4))
+        if self._session is None:
+            await self.start()
+        from aiohttp import ClientError
+
         params = {
             "phone": phone_number,
             "ip": "-1",
-            "api_id": app_settings.smsru_api_id,
+            "api_id": self.api_id,
         }
+        started = time.perf_counter()
         try:
-            async with self._session.post(app_settings.smsru_api_url, params=params) as response:
+            async with self._session.post(self.api_url, params=params) as response:
+                if response.status >= 500 or response.status == 429:
+                    raise SmsRuUnavailableError(f"Error while making phone call: HTTP {response.status}")
                 if response.status != 200:
-                    raise Exception("Error while making phone call")
+                    raise SmsRuRejectedError(f"Error while making phone call: HTTP {response.status}")
                 response_text = await response.text()
                 try:
                     response_data = json.loads(response_text)
                 except json.JSONDecodeError:
-                    raise Exception(f"Failed to decode JSON: {response_text}")
+                    raise SmsRuUnavailableError(f"Failed to decode JSON: {response_text}")
 
                 if response_data.get("status") == "OK":
                     last_4_digits = response_data.get("code")
                     return last_4_digits
                 else:
-                    raise Exception(f"Error in response: {response_data}")
-        except (
-                ClientConnectionError,
-                ServerConnectionError,
-                ServerDisconnectedError,
-                ServerTimeoutError,
-        ) as ex:
-            raise Exception(f"Error while making phone call: {str(ex)}")
+                    raise SmsRuRejectedError(f"Error in response: {response_data}")
+        except (ClientError, asyncio.TimeoutError) as ex:
+            # Любая ошибка транспорта, в том числе обрыв тела ответа, означает недоступность, а не отказ
+            raise SmsRuUnavailableError(f"Error while making phone call: {str(ex)}")
+        finally:
+            self.latency.observe(time.perf_counter() - started)
+
+
+@lru_cache
+def get_smsru_client() -> SmsRuClient:
+    """Клиент sms ru, один на процесс."""
+    app_settings = get_app_settings()
+    return SmsRuClient(
+        api_url=app_settings.smsru_api_url,
+        api_id=app_settings.smsru_api_id,
+        debug=app_settings.debug,
+        connect_timeout=app_settings.smsru_connect_timeout_seconds,
+        read_timeout=app_settings.smsru_read_timeout_seconds,
+        limit_per_host=app_settings.smsru_limit_per_host,
+        dns_cache_ttl=app_settings.smsru_dns_cache_ttl_seconds,
+        keepalive_timeout=app_settings.smsru_keepalive_timeout_seconds,
+    )
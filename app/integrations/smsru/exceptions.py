@@ -0,0 +1,10 @@
+class SmsRuError(Exception):
+    """Ошибка при работе с сервисом sms ru."""
+
+
+class SmsRuUnavailableError(SmsRuError):
+    """Сервис недоступен или ответил ошибкой сервера, запрос можно повторить."""
+
+
+class SmsRuRejectedError(SmsRuError):
+    """Сервис отклонил запрос, повтор не поможет."""
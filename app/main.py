@@ -1,21 +1,73 @@
+import asyncio
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from core.config import Settings, get_app_settings
+from core.admission import AdmissionControlMiddleware
+from core.config import Settings, get_app_settings, pool_limits
+from core.dependencies import admission_controller, async_engine, replica_engines, replica_router
 from core.exception_handler import (
     all_exception_handler,
     custom_validation_exception_handler,
     http_exception_handler,
     starlette_http_exception_handler,
 )
+from core.executor import get_cpu_executor, get_loop_lag_monitor
 from core.logging_config import setup_json_logging
-from endpoints.api import routers
+from core.rate_limit import get_rate_limiter
+from core.warmup import LifecycleState, lifecycle, warm_up
+from endpoints.api import get_routers
+from integrations.smsru.client import get_smsru_client
+from repositories.otp_store import get_otp_store
+from services.call_dispatcher import get_call_dispatcher
 from fastapi import FastAPI
 from fastapi.exceptions import HTTPException, RequestValidationError
-from fastapi.staticfiles import StaticFiles
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI) -> AsyncIterator[None]:  # noqa: ARG001
+    """Открытие и прогрев общих клиентов при старте приложения, их освобождение при остановке.
+
+    readiness отвечает готовностью только между концом прогрева и началом остановки.
+    """
+    settings: Settings = get_app_settings()
+    engines = [async_engine, *replica_engines]
+    smsru_client = get_smsru_client()
+    await smsru_client.start()
+    call_dispatcher = get_call_dispatcher()
+    call_dispatcher.start()
+    loop_lag_monitor = get_loop_lag_monitor()
+    loop_lag_monitor.start()
+    if settings.warmup_enabled:
+        pool_size, _ = pool_limits(settings)
+        await warm_up(
+            engines,
+            connections=min(settings.warmup_connections or pool_size, pool_size),
+            smsru_client=smsru_client,
+            timeout=settings.warmup_timeout_seconds,
+        )
+    else:
+        lifecycle.state = LifecycleState.READY
+
+    yield
+
+    lifecycle.state = LifecycleState.DRAINING
+    if settings.shutdown_drain_seconds:
+        await asyncio.sleep(settings.shutdown_drain_seconds)
+    await call_dispatcher.stop()
+    await loop_lag_monitor.stop()
+    # Поставленные задачи дожидаются в потоке, чтобы не блокировать цикл, пока закрываются остальные клиенты
+    await asyncio.to_thread(get_cpu_executor().shutdown)
+    await smsru_client.close()
+    await replica_router.close()
+    await get_otp_store().close()
+    await get_rate_limiter().backend.close()
+    for engine in engines:
+        await engine.dispose()
+
+
 def get_application() -> FastAPI:
     """Returns the FastAPI application instance."""
     settings: Settings = get_app_settings()
@@ -28,8 +80,14 @@ def get_application() -> FastAPI:
     application = FastAPI(
         **settings.model_dump(),
         separate_input_output_schemas=False,
+        lifespan=lifespan,
     )
 
+    if settings.admission_enabled:
+        application.add_middleware(
+            AdmissionControlMiddleware, controller=admission_controller, prefix=settings.api_prefix,
+        )
+
     if settings.allowed_hosts:
         from fastapi.middleware.cors import CORSMiddleware
 
@@ -41,10 +99,13 @@ def get_application() -> FastAPI:
             allow_headers=["*"],
         )
 
-    application.include_router(routers, prefix=settings.api_prefix)
+    for router in get_routers():
+        application.include_router(router, prefix=settings.api_prefix)
 
     static_dir = Path("static")
     if static_dir.is_dir():
+        from fastapi.staticfiles import StaticFiles
+
         application.mount("/health_tracker/static", StaticFiles(directory="static"), name="static")
 
     application.add_exception_handler(RequestValidationError, custom_validation_exception_handler)  # type: ignore
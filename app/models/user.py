@@ -1,7 +1,6 @@
 import uuid
 
-from core.config import Settings, get_app_settings
-from sqlalchemy import Boolean, Column, DateTime, String, func, ForeignKey, Float, Integer
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, String, func, ForeignKey, Float, Index, Integer, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import datetime
@@ -9,18 +8,24 @@ from datetime import timedelta
 
 from models.base import Base
 
-app_settings: Settings = get_app_settings()
-
 
 class WeightRecord(Base):
     """Модель для хранения записей о весе пользователя."""
 
     __tablename__ = "weight_record"
+    __table_args__ = (
+        # Выборки истории пользователя за период с пагинацией по (recorded_at, id)
+        Index("ix_weight_record_user_id_recorded_at_id", "user_id", "recorded_at", "id"),
+        # Синхронизация изменений по номеру изменения пользователя
+        Index("ix_weight_record_user_id_seq", "user_id", "seq"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"), nullable=False)
     weight = Column(Float, nullable=False)
     recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Номер изменения пользователя (User.change_seq), в котором запись была добавлена
+    seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="weight_records")
 
@@ -29,11 +34,19 @@ class WaterIntakeRecord(Base):
     """Модель для хранения записей о выпитой воде пользователя."""
 
     __tablename__ = "water_intake_record"
+    __table_args__ = (
+        # Выборки истории пользователя за период с пагинацией по (recorded_at, id)
+        Index("ix_water_intake_record_user_id_recorded_at_id", "user_id", "recorded_at", "id"),
+        # Синхронизация изменений по номеру изменения пользователя
+        Index("ix_water_intake_record_user_id_seq", "user_id", "seq"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"), nullable=False)
     water_amount = Column(Float, nullable=False)
     recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Номер изменения пользователя (User.change_seq), в котором запись была добавлена
+    seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="water_intake_records")
 
@@ -42,31 +55,43 @@ class StepRecord(Base):
     """Модель для хранения записей о количестве пройденных шагов пользователя."""
 
     __tablename__ = "step_record"
+    __table_args__ = (
+        # Выборки истории пользователя за период с пагинацией по (recorded_at, id)
+        Index("ix_step_record_user_id_recorded_at_id", "user_id", "recorded_at", "id"),
+        # Синхронизация изменений по номеру изменения пользователя
+        Index("ix_step_record_user_id_seq", "user_id", "seq"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"), nullable=False)
     steps_count = Column(Integer, nullable=False)
     recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Номер изменения пользователя (User.change_seq), в котором запись была добавлена
+    seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="step_records")
 
 
-class PhoneVerification(Base):
-    """Модель для хранения кодов подтверждения."""
-
-    __tablename__ = "phone_verification"
-
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
-    phone_number = Column(String, nullable=False)
-    code = Column(String, nullable=False)
-
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-
-
 class User(Base):
     """Модель пользователя."""
 
     __tablename__ = "user"
+    __table_args__ = (
+        # Поиск активных пользователей, удаленные в индексы не попадают
+        Index(
+            "ix_user_phone_number_unique_active",
+            "phone_number",
+            unique=True,
+            postgresql_where=text("is_deleted = false"),
+        ),
+        # Никнейм уникален среди активных пользователей без учета регистра
+        Index(
+            "ix_user_username_lower_active",
+            text("lower(username)"),
+            unique=True,
+            postgresql_where=text("is_deleted = false"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
     phone_number = Column(String, nullable=False)
@@ -75,7 +100,18 @@ class User(Base):
     is_deleted = Column(Boolean, index=True, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-
-    weight_records = relationship("WeightRecord", back_populates="user", cascade="all, delete-orphan", lazy="selectin")
-    water_intake_records = relationship("WaterIntakeRecord", back_populates="user", cascade="all, delete-orphan", lazy="selectin")
-    step_records = relationship("StepRecord", back_populates="user", cascade="all, delete-orphan", lazy="selectin")
+    # Монотонный номер изменения данных пользователя, увеличивается при каждой записи
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    weight_records = relationship(
+        "WeightRecord", back_populates="user", cascade="all, delete-orphan", lazy="raise",
+        order_by="[WeightRecord.recorded_at, WeightRecord.id]",
+    )
+    water_intake_records = relationship(
+        "WaterIntakeRecord", back_populates="user", cascade="all, delete-orphan", lazy="raise",
+        order_by="[WaterIntakeRecord.recorded_at, WaterIntakeRecord.id]",
+    )
+    step_records = relationship(
+        "StepRecord", back_populates="user", cascade="all, delete-orphan", lazy="raise",
+        order_by="[StepRecord.recorded_at, StepRecord.id]",
+    )
@@ -0,0 +1,83 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from core.cache import TTLCache
+from core.config import get_app_settings
+
+
+# Код удаляется, только если он совпал с введенным, сравнение и удаление выполняются атомарно
+CONSUME_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class OtpStore(ABC):
+    """Хранилище одноразовых кодов подтверждения.
+
+    На номер телефона хранится один действующий код, новый код заменяет предыдущий.
+    """
+
+    @abstractmethod
+    async def save(self, phone_number: str, code: str) -> None:
+        """Сохранение кода для номера телефона на время жизни кода."""
+
+    @abstractmethod
+    async def consume(self, phone_number: str, code: str) -> bool:
+        """Проверка кода и его удаление одной атомарной операцией, вернет False если код неверен или истек."""
+
+    async def close(self) -> None:
+        """Освобождение ресурсов хранилища."""
+
+
+class InMemoryOtpStore(OtpStore):
+    """Хранилище кодов в памяти процесса.
+
+    Подходит только для одного процесса: код, выданный одним воркером, не виден другим.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 100_000) -> None:
+        self._codes = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def save(self, phone_number: str, code: str) -> None:
+        self._codes.set(phone_number, code)
+
+    async def consume(self, phone_number: str, code: str) -> bool:
+        # Между чтением и удалением нет await, поэтому операция атомарна в рамках event loop
+        if self._codes.get(phone_number) != code:
+            return False
+        self._codes.pop(phone_number)
+        return True
+
+
+class RedisOtpStore(OtpStore):
+    """Хранилище кодов в Redis или любом сервере с протоколом Redis, общее для всех воркеров."""
+
+    def __init__(self, url: str, ttl: int, key_prefix: str = "otp:") -> None:
+        from redis.asyncio import Redis
+
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._redis = Redis.from_url(url)
+        self._consume = self._redis.register_script(CONSUME_SCRIPT)
+
+    async def save(self, phone_number: str, code: str) -> None:
+        await self._redis.set(f"{self.key_prefix}{phone_number}", code, ex=self.ttl)
+
+    async def consume(self, phone_number: str, code: str) -> bool:
+        deleted = await self._consume(keys=[f"{self.key_prefix}{phone_number}"], args=[code])
+        return deleted == 1
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+@lru_cache
+def get_otp_store() -> OtpStore:
+    """Хранилище кодов, выбранное в настройках, одно на процесс."""
+    app_settings = get_app_settings()
+    if app_settings.otp_store_backend == "redis":
+        return RedisOtpStore(url=app_settings.redis_url, ttl=app_settings.otp_ttl_seconds)
+    return InMemoryOtpStore(ttl=app_settings.otp_ttl_seconds)
@@ -1,123 +1,362 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import insert, select, delete
-from sqlalchemy.orm import selectinload
-from models.user import PhoneVerification, User, WaterIntakeRecord, WeightRecord, StepRecord
+from sqlalchemy import Row, exists, func, insert, select, update, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql.base import ExecutableOption
+from core.cache import principal_cache, username_cache
+from core.response_cache import me_response_cache
+from core.replicas import recent_writers
+from models.user import User, WaterIntakeRecord, WeightRecord, StepRecord
 import uuid
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from enum import StrEnum
+
+# Уникальный индекс по lower(username) среди активных пользователей
+USERNAME_INDEX = "ix_user_username_lower_active"
+
+RecordModel = type[StepRecord] | type[WeightRecord] | type[WaterIntakeRecord]
+
+# Тип записи истории, модель и колонка значения
+RECORD_COLUMNS = (
+    ("steps", StepRecord, StepRecord.steps_count),
+    ("weight", WeightRecord, WeightRecord.weight),
+    ("water", WaterIntakeRecord, WaterIntakeRecord.water_amount),
+)
+
+
+class UsernameTakenError(Exception):
+    """Никнейм уже занят другим пользователем."""
+
+
+def normalize_username(username: str) -> str:
+    """Никнейм в том виде, в котором он сравнивается индексом USERNAME_INDEX."""
+    return username.lower()
+
+
+class LoadProfile(StrEnum):
+    """Профили загрузки пользователя из базы."""
+
+    IDENTITY = "identity"  # только идентификаторы: id, телефон, никнейм
+    PROFILE = "profile"  # все поля пользователя без истории
+
+
+def _load_options(profile: LoadProfile) -> list[ExecutableOption]:
+    """Опции запроса для выбранного профиля загрузки."""
+    match profile:
+        case LoadProfile.IDENTITY:
+            return [load_only(User.id, User.phone_number, User.username, User.is_deleted)]
+        case LoadProfile.PROFILE:
+            return []
 
 
 class UserRepository:
     """Репозиторий для работы с пользователями."""
 
-    def __init__(self, db_session: AsyncSession) -> None:
+    def __init__(self, db_session: AsyncSession, read_session: AsyncSession | None = None) -> None:
         self.db_session = db_session
+        self.read_session = read_session or db_session
+        self._has_written = False
 
-    async def get_user_by_username(self, username: str) -> User | None:
-        """Получение пользователя по никнейму."""
-        statement = select(User).where(User.username == username)
-        result = await self.db_session.execute(statement)
-        return result.scalars().one_or_none()
+    def _reader(self, phone_number: str | None = None) -> AsyncSession:
+        """Сессия для чтения.
 
-    async def update_user_info(self, phone_number: str, update_data: dict) -> User:
-        """Метод для обновления информации о пользователе."""
-        statement = select(User).where(User.phone_number == phone_number)
-        result = await self.db_session.execute(statement)
-        user = result.scalars().one()
-
-        if "username" in update_data:
-            user.username = update_data["username"]
-        if "height" in update_data:
-            user.height = update_data["height"]
-
-        if "steps" in update_data:
-            new_steps = StepRecord(
-                user_id=user.id,
-                steps_count=update_data["steps"]["steps_count"],
-                recorded_at=update_data["steps"]["recorded_at"]
-            )
-            self.db_session.add(new_steps)
+        После записи в этом запросе или недавней записи пользователя чтение идет в основную базу,
+        чтобы пользователь видел свои изменения, пока реплики их не догнали.
+        """
+        if self._has_written or (phone_number is not None and recent_writers.get(phone_number)):
+            return self.db_session
+        return self.read_session
+
+    def _mark_written(self, phone_number: str) -> None:
+        """Фиксация записи данных пользователя в основную базу.
 
-        if "weight" in update_data:
-            new_weight = WeightRecord(
-                user_id=user.id,
-                weight=update_data["weight"]["weight"],
-                recorded_at=update_data["weight"]["recorded_at"]
+        Закешированные ответы пользователя после этого устарели.
+        """
+        self._has_written = True
+        recent_writers.set(phone_number, True)
+        me_response_cache.invalidate(phone_number)
+
+    async def is_username_taken(self, username: str) -> bool:
+        """Занят ли никнейм активным пользователем, запрос проверяется только по индексу никнейма."""
+        statement = select(
+            exists().where(func.lower(User.username) == normalize_username(username), User.is_deleted == False)
+        )
+        result = await self._reader().execute(statement)
+        return result.scalar_one()
+
+    async def update_user_info(self, phone_number: str, update_data: dict) -> tuple[Row, dict[str, Row]]:
+        """Метод для обновления информации о пользователе.
+
+        Поля профиля обновляются через UPDATE ... RETURNING, новые записи добавляются через INSERT ... RETURNING,
+        все в одной транзакции. UPDATE увеличивает номер изменения пользователя, им помечаются новые записи. Возвращает строку профиля и добавленные записи по их типу,
+        историю пользователя метод не читает.
+
+        Raises
+        ------
+            UsernameTakenError: Никнейм занят, уникальность проверяет индекс в той же транзакции.
+
+        """
+        profile_values = {field: update_data[field] for field in ("username", "height") if field in update_data}
+        # RETURNING отдает только новые значения, прежний никнейм читается в CTE под той же блокировкой строки
+        previous = (
+            select(User.id, User.username)
+            .where(User.phone_number == phone_number, User.is_deleted == False)
+            .with_for_update()
+            .cte("previous")
+        )
+        statement = (
+            update(User)
+            .where(User.id == previous.c.id)
+            .values(updated_at=func.now(), change_seq=User.change_seq + 1, **profile_values)
+            .returning(
+                User.id,
+                User.phone_number,
+                User.username,
+                User.height,
+                User.change_seq,
+                previous.c.username.label("previous_username"),
             )
-            self.db_session.add(new_weight)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await self.db_session.execute(statement)
+        except IntegrityError as ex:
+            await self.db_session.rollback()
+            if USERNAME_INDEX not in str(ex.orig):
+                raise
+            username_cache.set(normalize_username(profile_values["username"]), True)
+            raise UsernameTakenError(profile_values["username"]) from ex
+        user = result.one()
 
-        if "water" in update_data:
-            new_water = WaterIntakeRecord(
-                user_id=user.id,
-                water_amount=update_data["water"]["water_amount"],
-                recorded_at=update_data["water"]["recorded_at"]
+        inserted: dict[str, Row] = {}
+        for record_type, record_model, value_column in RECORD_COLUMNS:
+            if update_data.get(record_type) is None:
+                continue
+            statement = (
+                insert(record_model)
+                .values(id=uuid.uuid4(), user_id=user.id, seq=user.change_seq, **update_data[record_type])
+                .returning(value_column, record_model.recorded_at)
             )
-            self.db_session.add(new_water)
+            result = await self.db_session.execute(statement)
+            inserted[record_type] = result.one()
 
         await self.db_session.commit()
-        await self.db_session.refresh(user)
+        self._mark_written(phone_number)
+        if "username" in profile_values:
+            principal_cache.pop(phone_number)
+            # Прежний никнейм освободился, иначе кеш считал бы его занятым до истечения ttl
+            if user.previous_username is not None:
+                username_cache.pop(normalize_username(user.previous_username))
+            if user.username is not None:
+                username_cache.set(normalize_username(user.username), True)
 
-        return user
+        return user, inserted
 
-    async def get_user_full_data(self, phone_number: str) -> User | None:
-        """Метод для получения полной информации о пользователе, включая шаги, вес и воду."""
+    async def soft_delete_user(self, phone_number: str) -> bool:
+        """Пометка пользователя удаленным, вернет False если пользователь не найден."""
         statement = (
-            select(User)
+            update(User)
             .where(User.phone_number == phone_number, User.is_deleted == False)
-            .options(
-                selectinload(User.step_records),
-                selectinload(User.weight_records),
-                selectinload(User.water_intake_records)
-            )
+            .values(is_deleted=True, change_seq=User.change_seq + 1)
+            .returning(User.id, User.username)
         )
         result = await self.db_session.execute(statement)
-        return result.scalars().one_or_none()
+        deleted_user = result.one_or_none()
+        deleted = deleted_user is not None
+        await self.db_session.commit()
+        self._mark_written(phone_number)
+        principal_cache.pop(phone_number)
+        # Никнейм удаленного пользователя снова свободен
+        if deleted and deleted_user.username is not None:
+            username_cache.pop(normalize_username(deleted_user.username))
 
-    async def get_user_by_phone_number(self, phone_number: str) -> User | None:
-        """Метод для получения пользователя по номеру телефона, если пользователя нет, то вернет None."""
-        statement = select(User).where(User.phone_number == phone_number)
-        result = await self.db_session.execute(statement)
-        return result.scalars().one_or_none()
+        return deleted
 
-    async def create_user_by_phone_number(self, phone_number: str) -> User | None:
-        """Создание пользователя в базе по номеру телефона."""
-        statement = insert(User).values(
-            id=uuid.uuid4(),
-            phone_number=phone_number,
-        ).returning(User)
-        result = await self.db_session.execute(statement)
-        new_record = result.scalars().one()
-        await self.db_session.commit()
+    async def get_user_history_rows(
+        self, phone_number: str, since: datetime | None = None,
+    ) -> tuple[Row, dict[str, Sequence[Row]]] | None:
+        """Данные пользователя и его история строками (значение, recorded_at) без создания ORM объектов.
 
-        return new_record
+        Используется там, где результат сразу сериализуется, вернет None если пользователь не найден.
+        """
+        reader = self._reader(phone_number)
+        statement = select(User.id, User.phone_number, User.username, User.height).where(
+            User.phone_number == phone_number, User.is_deleted == False,
+        )
+        user = (await reader.execute(statement)).one_or_none()
+        if user is None:
+            return None
+
+        history = {}
+        for record_type, record_model, value_column in RECORD_COLUMNS:
+            statement = (
+                select(value_column, record_model.recorded_at)
+                .where(record_model.user_id == user.id)
+                .order_by(record_model.recorded_at, record_model.id)
+            )
+            if since is not None:
+                statement = statement.where(record_model.recorded_at >= since)
+            history[record_type] = (await reader.execute(statement)).all()
+        return user, history
+
+    async def get_changes_since(
+        self, phone_number: str, after_seq: int,
+    ) -> tuple[int, dict[str, Sequence[Row]]] | None:
+        """Записи истории, добавленные после номера изменения after_seq, строками (значение, recorded_at).
+
+        Возвращает текущий номер изменения пользователя и записи с номером не больше него,
+        поэтому записи, добавленные во время чтения, попадут в следующую синхронизацию.
+        Вернет None если пользователь не найден.
+        """
+        reader = self._reader(phone_number)
+        statement = select(User.id, User.change_seq).where(
+            User.phone_number == phone_number, User.is_deleted == False,
+        )
+        user = (await reader.execute(statement)).one_or_none()
+        if user is None:
+            return None
+
+        changes = {}
+        for record_type, record_model, value_column in RECORD_COLUMNS:
+            if user.change_seq <= after_seq:
+                changes[record_type] = []
+                continue
+            statement = (
+                select(value_column, record_model.recorded_at)
+                .where(
+                    record_model.user_id == user.id,
+                    record_model.seq > after_seq,
+                    record_model.seq <= user.change_seq,
+                )
+                .order_by(record_model.seq, record_model.recorded_at, record_model.id)
+            )
+            changes[record_type] = (await reader.execute(statement)).all()
+        return user.change_seq, changes
 
-    async def create_phone_code_row(self, phone_number: str, last_4_digits: str) -> PhoneVerification:
-        """Метод для создания строки с номером телефона и кода."""
-        statement = insert(PhoneVerification).values(
-            id=uuid.uuid4(),
-            phone_number=phone_number,
-            code=last_4_digits,
-        ).returning(PhoneVerification)
+    async def add_records_batch(
+        self,
+        phone_number: str,
+        steps: list[dict],
+        weight: list[dict],
+        water: list[dict],
+    ) -> bool:
+        """Сохранение пакета записей истории в одной транзакции, вернет False если пользователь не найден.
 
+        Записи вставляются многострочными INSERT, по одному пакету на каждую таблицу,
+        и помечаются новым номером изменения пользователя.
+        """
+        statement = (
+            update(User)
+            .where(User.phone_number == phone_number, User.is_deleted == False)
+            .values(change_seq=User.change_seq + 1)
+            .returning(User.id, User.change_seq)
+            .execution_options(synchronize_session=False)
+        )
         result = await self.db_session.execute(statement)
-        new_record = result.scalars().one()
+        user = result.one_or_none()
+        if user is None:
+            return False
+
+        for record_model, rows in ((StepRecord, steps), (WeightRecord, weight), (WaterIntakeRecord, water)):
+            if rows:
+                await self.db_session.execute(
+                    insert(record_model),
+                    [{"id": uuid.uuid4(), "user_id": user.id, "seq": user.change_seq, **row} for row in rows],
+                )
+
         await self.db_session.commit()
+        self._mark_written(phone_number)
+        return True
 
-        return new_record
+    async def get_records_page(
+        self,
+        record_model: RecordModel,
+        phone_number: str,
+        date_from: datetime | None,
+        date_to: datetime | None,
+        after: tuple[datetime, uuid.UUID] | None,
+        limit: int,
+    ) -> list:
+        """Страница записей истории одной метрики, отсортированная по (recorded_at, id).
 
-    async def check_code(self, phone_number: str, code: str) -> bool:
-        """Метод для проверки правильности введенного кода и удаления записи."""
+        Пагинация по ключу: after - это (recorded_at, id) последней записи предыдущей страницы.
+        """
+        user_id = (
+            select(User.id)
+            .where(User.phone_number == phone_number, User.is_deleted == False)
+            .scalar_subquery()
+        )
+        statement = select(record_model).where(record_model.user_id == user_id)
+        if date_from is not None:
+            statement = statement.where(record_model.recorded_at >= date_from)
+        if date_to is not None:
+            statement = statement.where(record_model.recorded_at < date_to)
+        if after is not None:
+            statement = statement.where(tuple_(record_model.recorded_at, record_model.id) > tuple_(*after))
 
-        statement = (select(PhoneVerification).where(PhoneVerification.phone_number == phone_number).where(
-            PhoneVerification.code == code
-        ))
+        statement = statement.order_by(record_model.recorded_at, record_model.id).limit(limit)
+        result = await self._reader(phone_number).execute(statement)
+        return list(result.scalars().all())
 
-        result = await self.db_session.execute(statement)
-        verification_record = result.scalars().first()
+    async def stream_records(
+        self, phone_number: str, chunk_size: int = 1000,
+    ) -> AsyncIterator[tuple[str, Sequence]]:
+        """Потоковое чтение всей истории пользователя через серверный курсор.
 
-        if verification_record is None:
-            return False
+        Отдает пары (тип записи, порция строк (значение, recorded_at)) размером не больше chunk_size,
+        поэтому потребление памяти не зависит от объема истории.
+        """
+        user_id = (
+            select(User.id)
+            .where(User.phone_number == phone_number, User.is_deleted == False)
+            .scalar_subquery()
+        )
+        for record_type, record_model, value_column in RECORD_COLUMNS:
+            statement = (
+                select(value_column, record_model.recorded_at)
+                .where(record_model.user_id == user_id)
+                .order_by(record_model.recorded_at, record_model.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            result = await self._reader(phone_number).stream(statement)
+            async for rows in result.partitions():
+                yield record_type, rows
+
+    async def get_user_by_phone_number(
+        self, phone_number: str, profile: LoadProfile = LoadProfile.IDENTITY, primary: bool = False,
+    ) -> User | None:
+        """Метод для получения пользователя по номеру телефона, если пользователя нет, то вернет None.
+
+        primary=True читает из основной базы, например перед созданием пользователя.
+        """
+        statement = (
+            select(User)
+            .where(User.phone_number == phone_number, User.is_deleted == False)
+            .options(*_load_options(profile))
+        )
+        session = self.db_session if primary else self._reader(phone_number)
+        result = await session.execute(statement)
+        return result.scalars().one_or_none()
 
-        delete_statement = delete(PhoneVerification).where(PhoneVerification.id == verification_record.id)
-        await self.db_session.execute(delete_statement)
+    async def create_user_by_phone_number(self, phone_number: str) -> User | None:
+        """Создание пользователя в базе по номеру телефона.
+
+        Если активный пользователь с этим номером уже создан параллельным запросом,
+        то вставка пропускается по уникальному индексу и возвращается существующий пользователь.
+        """
+        statement = (
+            pg_insert(User)
+            .values(id=uuid.uuid4(), phone_number=phone_number)
+            .on_conflict_do_nothing(index_elements=[User.phone_number], index_where=User.is_deleted == False)
+            .returning(User)
+        )
+        result = await self.db_session.execute(statement)
+        new_record = result.scalars().one_or_none()
+        if new_record is None:
+            new_record = await self.get_user_by_phone_number(phone_number, profile=LoadProfile.PROFILE, primary=True)
         await self.db_session.commit()
+        self._mark_written(phone_number)
 
-        return True
+        return new_record
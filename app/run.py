@@ -0,0 +1,84 @@
+"""Запуск приложения в продакшене: несколько воркеров uvicorn на uvloop и httptools.
+
+Запуск из каталога app: ``python run.py``, число воркеров берется из WEB_WORKERS или ``--workers``.
+Плавный перезапуск: ``kill -HUP <pid run.py>`` перезапускает воркеры по одному,
+остальные в это время продолжают принимать запросы на общем сокете.
+Число воркеров сигналами SIGTTIN и SIGTTOU не менять: бюджет соединений рассчитан на web_workers.
+"""
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from core.config import Settings, get_app_settings, pool_limits
+
+logger = logging.getLogger("health_tracker")
+
+
+def check_per_worker_state(settings: Settings) -> None:
+    """Проверка состояния, которое хранится в памяти каждого воркера отдельно.
+
+    Код из памяти одного воркера не виден другому, и проверка кода не проходит,
+    а лимиты в памяти умножаются на число воркеров, поэтому с ними несколько воркеров не запускаются.
+
+    Raises
+    ------
+        ValueError: Несколько воркеров с хранилищем кодов или лимитов в памяти.
+
+    """
+    if settings.otp_store_backend == "memory":
+        raise ValueError(
+            "web_workers > 1 requires OTP_STORE_BACKEND=redis: a code saved by one worker "
+            "is invisible to the worker that verifies it"
+        )
+    if settings.rate_limit_enabled and settings.rate_limit_backend == "memory":
+        raise ValueError(
+            "web_workers > 1 requires RATE_LIMIT_BACKEND=redis: in-memory limits are multiplied by the number of workers"
+        )
+    logger.warning("Call job statuses are kept per worker: GET /user/call/{job_id} may answer 404 on another worker")
+    if settings.me_cache_enabled:
+        logger.warning(
+            "Response cache is per worker: a write through one worker is seen by others after %.0f s",
+            settings.me_cache_ttl_seconds,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, help="число воркеров вместо WEB_WORKERS")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    if args.workers is not None:
+        # Воркеры читают настройки сами, число воркеров нужно им для расчета доли бюджета соединений
+        os.environ["WEB_WORKERS"] = str(args.workers)
+    settings = get_app_settings()
+
+    if settings.web_workers > 1:
+        try:
+            check_per_worker_state(settings)
+        except ValueError as ex:
+            parser.exit(status=1, message=f"{ex}\n")
+
+    pool_size, max_overflow = pool_limits(settings)
+    logger.info(
+        "Starting %d workers, up to %d connections per worker and %d in total to each database",
+        settings.web_workers,
+        pool_size + max_overflow,
+        settings.web_workers * (pool_size + max_overflow),
+    )
+
+    uvicorn.run(
+        "main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=settings.web_workers,
+        loop="uvloop",
+        http="httptools",
+        timeout_graceful_shutdown=settings.server_graceful_shutdown_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ class LivenessReadinessStatus(StrEnum):
     READY = "ready"
     ALIVE = "alive"
     ERROR = "error"
+    STARTING = "starting"
+    DRAINING = "draining"
 
 
 class LivenessReadinessSchema(BaseModel):
@@ -0,0 +1,93 @@
+from pydantic import BaseModel, Field
+
+
+class HistogramSchema(BaseModel):
+    """Схема гистограммы с накопительными корзинами."""
+
+    buckets: dict[str, int] = Field(
+        ...,
+        description="Количество наблюдений не больше границы корзины в секундах.",
+        examples=[{"0.001": 120, "0.005": 130, "+Inf": 131}],
+    )
+    count: int = Field(..., description="Общее количество наблюдений.", examples=[131])
+    sum: float = Field(..., description="Сумма наблюдений в секундах.", examples=[0.284])
+
+
+class PoolMetricsSchema(BaseModel):
+    """Схема состояния пула соединений с базой."""
+
+    size: int = Field(..., description="Постоянный размер пула.", examples=[20])
+    checked_in: int = Field(..., description="Свободные соединения в пуле.", examples=[17])
+    checked_out: int = Field(..., description="Соединения, занятые запросами.", examples=[3])
+    overflow: int = Field(..., description="Соединения сверх постоянного размера пула.", examples=[0])
+    waiting: int = Field(..., description="Запросы, ожидающие соединение прямо сейчас.", examples=[0])
+    checkouts: int = Field(..., description="Всего выдано соединений.", examples=[5120])
+    connects: int = Field(..., description="Всего открыто новых соединений.", examples=[20])
+    invalidations: int = Field(..., description="Всего инвалидировано соединений.", examples=[0])
+    timeouts: int = Field(..., description="Запросы, не дождавшиеся соединения.", examples=[0])
+    wait_time_seconds_total: float = Field(
+        ..., description="Суммарное время ожидания соединения в секундах.", examples=[1.52],
+    )
+    checkout_latency: HistogramSchema = Field(..., description="Время получения соединения из пула.")
+
+
+class RouteAdmissionSchema(BaseModel):
+    """Схема состояния лимита одновременных запросов одного класса маршрутов."""
+
+    limit: int = Field(..., description="Лимит одновременных запросов.", examples=[200])
+    in_flight: int = Field(..., description="Запросы, выполняющиеся прямо сейчас.", examples=[12])
+    waiting: int = Field(..., description="Запросы, ожидающие допуска.", examples=[0])
+    shed: int = Field(..., description="Запросы, отклоненные по таймауту ожидания.", examples=[0])
+
+
+class AdmissionMetricsSchema(BaseModel):
+    """Схема состояния допуска запросов."""
+
+    pool_shed: int = Field(..., description="Запросы, отклоненные из-за перегрузки пула базы.", examples=[0])
+    routes: dict[str, RouteAdmissionSchema] = Field(..., description="Лимиты по классам маршрутов.")
+
+
+class ResponseCacheMetricsSchema(BaseModel):
+    """Схема счетчиков кеша ответов."""
+
+    hits: int = Field(..., description="Ответы из кеша.", examples=[9120])
+    stale_hits: int = Field(..., description="Устаревшие ответы, отданные с обновлением в фоне.", examples=[35])
+    misses: int = Field(..., description="Ответы, собранные из базы.", examples=[410])
+    stale_errors: int = Field(..., description="Устаревшие ответы, отданные из-за ошибки базы.", examples=[0])
+    evictions: int = Field(..., description="Пользователи, вытесненные из-за лимита памяти.", examples=[0])
+    entries: int = Field(..., description="Ответов в кеше.", examples=[380])
+    bytes: int = Field(..., description="Суммарный размер ответов в байтах.", examples=[5242880])
+
+
+class ExecutorMetricsSchema(BaseModel):
+    """Схема состояния пула для CPU работы."""
+
+    kind: str = Field(..., description="Тип пула: thread или process.", examples=["thread"])
+    workers: int = Field(..., description="Число потоков или процессов пула.", examples=[4])
+    offloaded: int = Field(..., description="Задачи, выполненные в пуле.", examples=[120])
+    inline: int = Field(..., description="Задачи меньше порога, выполненные в цикле событий.", examples=[5300])
+    run_time: HistogramSchema = Field(..., description="Время задачи в пуле вместе с ожиданием свободного потока.")
+
+
+class LoopLagSchema(HistogramSchema):
+    """Схема задержки цикла событий."""
+
+    max: float = Field(..., description="Наибольшая задержка с запуска процесса в секундах.", examples=[0.012])
+
+
+class MetricsSchema(BaseModel):
+    """Схема внутренних метрик процесса."""
+
+    worker: str = Field(..., description="Воркер, метрики которого получены: хост и pid.", examples=["api-7f9c:42"])
+    pools: dict[str, PoolMetricsSchema] = Field(
+        ...,
+        description="Пулы соединений по адресу базы.",
+    )
+    http_clients: dict[str, HistogramSchema] = Field(
+        ...,
+        description="Время исходящих запросов к внешним сервисам.",
+    )
+    admission: AdmissionMetricsSchema = Field(..., description="Допуск запросов и сброс нагрузки.")
+    response_caches: dict[str, ResponseCacheMetricsSchema] = Field(..., description="Кеши ответов по эндпоинту.")
+    executor: ExecutorMetricsSchema = Field(..., description="Пул для CPU работы вне цикла событий.")
+    loop_lag: LoopLagSchema = Field(..., description="Задержка цикла событий синхронной работой.")
@@ -1,7 +1,11 @@
 from datetime import datetime
+from enum import StrEnum
+from typing import Annotated, Any, Literal
 
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-import phonenumbers
+from typing_extensions import TypedDict
+
+from core.phone import normalize_phone_number
 
 
 class TokenPayloadSchema(BaseModel):
@@ -60,6 +64,48 @@ class UserWaterSchema(BaseModel):
     )
 
 
+class UserStepsPageSchema(BaseModel):
+    """Схема страницы истории шагов пользователя."""
+    items: list[UserStepsSchema] = Field(
+        ...,
+        description="Записи о шагах, отсортированные по дате.",
+        examples=[[{"steps_count": 4355, "recorded_at": "2020-03-14T00:00:00Z"}]],
+    )
+    next_cursor: str | None = Field(
+        None,
+        description="Курсор следующей страницы, если записей больше нет, то null.",
+        examples=["MjAyMC0wMy0xNFQwMDowMDowMCswMDowMHw4MGU3MzY3ZC0wOThhLTQwYzAtOWY2OS0zZTEwZGFiNDI1YmI"],
+    )
+
+
+class UserWeightPageSchema(BaseModel):
+    """Схема страницы истории веса пользователя."""
+    items: list[UserWeightSchema] = Field(
+        ...,
+        description="Записи о весе, отсортированные по дате.",
+        examples=[[{"weight": 89.5, "recorded_at": "2020-03-15T00:00:00Z"}]],
+    )
+    next_cursor: str | None = Field(
+        None,
+        description="Курсор следующей страницы, если записей больше нет, то null.",
+        examples=["MjAyMC0wMy0xNFQwMDowMDowMCswMDowMHw4MGU3MzY3ZC0wOThhLTQwYzAtOWY2OS0zZTEwZGFiNDI1YmI"],
+    )
+
+
+class UserWaterPageSchema(BaseModel):
+    """Схема страницы истории выпитой воды пользователя."""
+    items: list[UserWaterSchema] = Field(
+        ...,
+        description="Записи о выпитой воде, отсортированные по дате.",
+        examples=[[{"water_amount": 4.1, "recorded_at": "2020-03-16T00:00:00Z"}]],
+    )
+    next_cursor: str | None = Field(
+        None,
+        description="Курсор следующей страницы, если записей больше нет, то null.",
+        examples=["MjAyMC0wMy0xNFQwMDowMDowMCswMDowMHw4MGU3MzY3ZC0wOThhLTQwYzAtOWY2OS0zZTEwZGFiNDI1YmI"],
+    )
+
+
 class UserSchema(BaseModel):
     """Схема пользователя."""
 
@@ -77,6 +123,21 @@ class UserSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UsernameAvailabilitySchema(BaseModel):
+    """Схема ответа проверки никнейма."""
+
+    username: str = Field(
+        ...,
+        description="Проверенный никнейм.",
+        examples=["user_1"],
+    )
+    available: bool = Field(
+        ...,
+        description="Свободен ли никнейм.",
+        examples=[True],
+    )
+
+
 class UserDetailSchema(BaseModel):
     phone_number: str = Field(
         ...,
@@ -112,6 +173,63 @@ class UserDetailSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserSyncSchema(BaseModel):
+    """Схема записей истории, добавленных после курсора синхронизации."""
+
+    steps: list[UserStepsSchema] = Field(
+        ...,
+        description="Новые записи о шагах.",
+        examples=[[{"steps_count": 4355, "recorded_at": "2020-03-14T00:00:00Z"}]],
+    )
+    weight: list[UserWeightSchema] = Field(
+        ...,
+        description="Новые записи о весе.",
+        examples=[[{"weight": 89.5, "recorded_at": "2020-03-15T00:00:00Z"}]],
+    )
+    water: list[UserWaterSchema] = Field(
+        ...,
+        description="Новые записи о выпитой воде.",
+        examples=[[{"water_amount": 4.1, "recorded_at": "2020-03-16T00:00:00Z"}]],
+    )
+    cursor: str = Field(
+        ...,
+        description="Курсор для следующей синхронизации.",
+        examples=["djF8NDI"],
+    )
+
+
+class StepsRecordPayload(TypedDict):
+    """Запись шагов в ответе без создания модели на каждую строку, поля в порядке UserStepsSchema."""
+
+    steps_count: int
+    recorded_at: datetime
+
+
+class WeightRecordPayload(TypedDict):
+    """Запись веса в ответе, поля в порядке UserWeightSchema."""
+
+    weight: float
+    recorded_at: datetime
+
+
+class WaterRecordPayload(TypedDict):
+    """Запись воды в ответе, поля в порядке UserWaterSchema."""
+
+    water_amount: float
+    recorded_at: datetime
+
+
+class UserDetailPayload(TypedDict):
+    """Ответ UserDetailSchema в виде словаря для сериализации напрямую из строк базы."""
+
+    phone_number: str
+    username: str | None
+    height: int | None
+    steps: list[StepsRecordPayload]
+    weight: list[WeightRecordPayload]
+    water: list[WaterRecordPayload]
+
+
 class TokenResponseSchema(BaseModel):
     """Схема для возврата на эндпоинте refresh."""
     access_token: str | None = Field(
@@ -166,15 +284,7 @@ class UserCallSchema(BaseModel):
 
     @field_validator("phone_number")
     def validate_phone_number(cls, v):
-        if v is None:
-            return v
-        try:
-            phone_number = phonenumbers.parse(v, "RU")
-            if not phonenumbers.is_valid_number(phone_number):
-                raise ValueError("Invalid phone number")
-        except phonenumbers.NumberParseException:
-            raise ValueError("Invalid phone number format")
-        return v
+        return normalize_phone_number(v)
 
 
 class UserCallResponseSchema(BaseModel):
@@ -185,6 +295,45 @@ class UserCallResponseSchema(BaseModel):
         description="Статус запроса на звонок",
         examples=[True, False]
     )
+    job_id: str | None = Field(
+        None,
+        description="Идентификатор задачи на звонок для проверки ее статуса.",
+        examples=["5b0e3f4a-6c1d-4bfa-9a47-3f0f3ad2f9f1"],
+    )
+
+
+class CallJobStatus(StrEnum):
+    """Статус задачи на звонок."""
+
+    QUEUED = "queued"
+    IN_PROGRESS = "in_progress"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class CallJobStatusSchema(BaseModel):
+    """Схема статуса задачи на звонок."""
+
+    job_id: str = Field(
+        ...,
+        description="Идентификатор задачи.",
+        examples=["5b0e3f4a-6c1d-4bfa-9a47-3f0f3ad2f9f1"],
+    )
+    status: CallJobStatus = Field(
+        ...,
+        description="Статус задачи.",
+        examples=["queued", "in_progress", "sent", "failed"],
+    )
+    attempts: int = Field(
+        0,
+        description="Количество попыток звонка.",
+        examples=[1],
+    )
+    error: str | None = Field(
+        None,
+        description="Причина ошибки, если звонок не удался.",
+        examples=["Сервис звонков недоступен."],
+    )
 
 
 class UserVerifyResponseSchema(BaseModel):
@@ -224,3 +373,113 @@ class UserVerifySchema(BaseModel):
         description="Четырехзначный код, который ввел пользователь",
         examples=["0000"]
     )
+
+    @field_validator("phone_number")
+    def validate_phone_number(cls, v):
+        return normalize_phone_number(v)
+
+
+class BatchStepsRecordSchema(UserStepsSchema):
+    """Запись о шагах в пакете синхронизации."""
+    type: Literal["steps"] = Field(..., description="Тип записи.", examples=["steps"])
+
+
+class BatchWeightRecordSchema(UserWeightSchema):
+    """Запись о весе в пакете синхронизации."""
+    type: Literal["weight"] = Field(..., description="Тип записи.", examples=["weight"])
+
+
+class BatchWaterRecordSchema(UserWaterSchema):
+    """Запись о выпитой воде в пакете синхронизации."""
+    type: Literal["water"] = Field(..., description="Тип записи.", examples=["water"])
+
+
+BatchRecordSchema = Annotated[
+    BatchStepsRecordSchema | BatchWeightRecordSchema | BatchWaterRecordSchema,
+    Field(discriminator="type"),
+]
+
+
+class UserRecordsBatchSchema(BaseModel):
+    """Схема пакета записей для синхронизации с носимых устройств.
+
+    Записи валидируются по отдельности, поэтому невалидная запись не отклоняет весь пакет.
+    """
+    records: list[dict[str, Any]] = Field(
+        ...,
+        max_length=10_000,
+        description="Записи о шагах, весе и воде вперемешку.",
+        examples=[[
+            {"type": "steps", "steps_count": 4355, "recorded_at": "2020-03-14T10:00:00Z"},
+            {"type": "weight", "weight": 89.5, "recorded_at": "2020-03-14T10:00:00Z"},
+            {"type": "water", "water_amount": 0.3, "recorded_at": "2020-03-14T10:00:00Z"},
+        ]],
+    )
+
+
+class BatchRecordErrorSchema(BaseModel):
+    """Схема ошибки отдельной записи пакета."""
+    index: int = Field(..., description="Позиция записи в пакете.", examples=[3])
+    detail: str = Field(..., description="Причина отклонения записи.", examples=["Field required"])
+
+
+class UserRecordsBatchResponseSchema(BaseModel):
+    """Схема результата загрузки пакета записей."""
+    accepted: int = Field(..., description="Количество сохраненных записей.", examples=[998])
+    rejected: int = Field(..., description="Количество отклоненных записей.", examples=[2])
+    errors: list[BatchRecordErrorSchema] = Field(
+        default_factory=list,
+        description="Ошибки по отклоненным записям.",
+        examples=[[{"index": 3, "detail": "Field required"}]],
+    )
+
+
+class ExportFormat(StrEnum):
+    """Формат выгрузки истории пользователя."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ResponseFormat(StrEnum):
+    """Формат ответа с историей, выбирается по заголовку Accept."""
+
+    JSON = "application/json"
+    COLUMNAR_JSON = "application/vnd.health-tracker.columnar+json"
+    COLUMNAR_MSGPACK = "application/vnd.health-tracker.columnar+msgpack"
+
+
+class MetricSeriesSchema(BaseModel):
+    """Схема истории одной метрики в колоночном виде: параллельные массивы времени и значений."""
+
+    timestamps: list[int] = Field(
+        ...,
+        description="Время записей в секундах Unix epoch, по возрастанию.",
+        examples=[[1584144000, 1584230400]],
+    )
+    values: list[int] | list[float] = Field(
+        ...,
+        description="Значения записей в том же порядке, что и timestamps.",
+        examples=[[4355, 8120]],
+    )
+
+
+class UserDetailColumnarSchema(BaseModel):
+    """Схема информации о пользователе с историей в колоночном виде."""
+
+    phone_number: str = Field(..., description="Номер телефона.", examples=["+79182773844"])
+    username: str | None = Field(None, description="Никнейм пользователя.", examples=["user_1"])
+    height: int | None = Field(None, description="Рост пользователя.", examples=[180])
+    steps: MetricSeriesSchema = Field(..., description="История шагов.")
+    weight: MetricSeriesSchema = Field(..., description="История веса.")
+    water: MetricSeriesSchema = Field(..., description="История выпитой воды.")
+
+
+class RecordsPageColumnarSchema(MetricSeriesSchema):
+    """Схема страницы истории метрики в колоночном виде."""
+
+    next_cursor: str | None = Field(
+        None,
+        description="Курсор следующей страницы, если записей больше нет, то null.",
+        examples=["MjAyMC0wMy0xNFQwMDowMDowMCswMDowMHw4MGU3MzY3ZC0wOThhLTQwYzAtOWY2OS0zZTEwZGFiNDI1YmI"],
+    )
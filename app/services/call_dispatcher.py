@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import math
+import random
+import uuid
+from functools import lru_cache
+
+from core.cache import TTLCache
+from core.circuit_breaker import CircuitBreaker, CircuitState
+from core.config import get_app_settings
+from integrations.smsru.client import SmsRuClient, get_smsru_client
+from integrations.smsru.exceptions import SmsRuError, SmsRuRejectedError
+from repositories.otp_store import OtpStore, get_otp_store
+from schemas.user import CallJobStatus, CallJobStatusSchema
+
+logger = logging.getLogger("health_tracker")
+
+
+class CallDispatchUnavailableError(Exception):
+    """Звонок нельзя поставить в очередь: очередь переполнена или sms ru недоступен."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CallDispatcher:
+    """Очередь запросов на звонок с фиксированным числом воркеров.
+
+    Запрос на звонок сразу возвращает идентификатор задачи, звонок выполняется в фоне:
+    временные ошибки sms ru повторяются с экспоненциальной задержкой со случайным разбросом,
+    а при серии ошибок предохранитель отклоняет новые звонки, не дожидаясь таймаутов.
+    """
+
+    def __init__(
+        self,
+        client: SmsRuClient,
+        otp_store: OtpStore,
+        workers: int = 10,
+        queue_size: int = 1000,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 5.0,
+        breaker: CircuitBreaker | None = None,
+        job_ttl: float = 600.0,
+    ) -> None:
+        self.client = client
+        self.otp_store = otp_store
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+        self._queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=queue_size)
+        self._jobs = TTLCache(maxsize=queue_size * 10, ttl=job_ttl)
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Запуск воркеров очереди."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Остановка воркеров, незавершенные звонки отменяются."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, phone_number: str) -> str:
+        """Постановка звонка в очередь, возвращает идентификатор задачи."""
+        if self.breaker.state == CircuitState.OPEN:
+            raise CallDispatchUnavailableError(
+                "Сервис звонков временно недоступен.",
+                retry_after=math.ceil(self.breaker.retry_after()),
+            )
+        self.start()
+        job_id = str(uuid.uuid4())
+        try:
+            self._queue.put_nowait((job_id, phone_number))
+        except asyncio.QueueFull:
+            raise CallDispatchUnavailableError("Очередь звонков переполнена.", retry_after=1)
+        self._jobs.set(job_id, CallJobStatusSchema(job_id=job_id, status=CallJobStatus.QUEUED))
+        return job_id
+
+    def get_status(self, job_id: str) -> CallJobStatusSchema | None:
+        """Статус задачи, None если задача неизвестна или устарела."""
+        return self._jobs.get(job_id)
+
+    def _backoff(self, attempt: int) -> float:
+        # Полный разброс: клиенты, упавшие одновременно, не повторяют запрос синхронно
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, phone_number = await self._queue.get()
+            try:
+                await self._process(job_id, phone_number)
+            except Exception:
+                logger.exception("Call job %s failed unexpectedly", job_id)
+                self._set_status(job_id, status=CallJobStatus.FAILED, error="Внутренняя ошибка.")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str, phone_number: str) -> None:
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._set_status(job_id, status=CallJobStatus.FAILED, error="Сервис звонков временно недоступен.")
+                return
+            self._set_status(job_id, status=CallJobStatus.IN_PROGRESS, attempts=attempt + 1)
+            try:
+                code = await self.client.make_phone_call(phone_number=phone_number)
+            except SmsRuRejectedError as ex:
+                # Отказ sms ru по существу запроса не исправится повтором и не говорит о недоступности
+                self.breaker.record_success()
+                logger.warning("Call job %s rejected: %s", job_id, ex)
+                self._set_status(job_id, status=CallJobStatus.FAILED, error="Звонок отклонен сервисом.")
+                return
+            except SmsRuError as ex:
+                self.breaker.record_failure()
+                logger.warning("Call job %s attempt %s failed: %s", job_id, attempt + 1, ex)
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                # Иначе пробный вызов полуоткрытого предохранителя так и остался бы незавершенным
+                self.breaker.record_failure()
+                raise
+
+            self.breaker.record_success()
+            await self.otp_store.save(phone_number=phone_number, code=code)
+            self._set_status(job_id, status=CallJobStatus.SENT)
+            return
+
+        self._set_status(job_id, status=CallJobStatus.FAILED, error="Сервис звонков недоступен.")
+
+    def _set_status(self, job_id: str, **changes) -> None:
+        job: CallJobStatusSchema | None = self._jobs.get(job_id)
+        if job is None:
+            job = CallJobStatusSchema(job_id=job_id, status=CallJobStatus.QUEUED)
+        self._jobs.set(job_id, job.model_copy(update=changes))
+
+
+@lru_cache
+def get_call_dispatcher() -> CallDispatcher:
+    """Очередь звонков, одна на процесс."""
+    app_settings = get_app_settings()
+    return CallDispatcher(
+        client=get_smsru_client(),
+        otp_store=get_otp_store(),
+        workers=app_settings.call_dispatcher_workers,
+        queue_size=app_settings.call_queue_size,
+        max_retries=app_settings.call_max_retries,
+        base_delay=app_settings.call_retry_base_delay_seconds,
+        max_delay=app_settings.call_retry_max_delay_seconds,
+        breaker=CircuitBreaker(
+            failure_threshold=app_settings.circuit_failure_threshold,
+            reset_timeout=app_settings.circuit_reset_timeout_seconds,
+        ),
+        job_ttl=app_settings.call_job_ttl_seconds,
+    )
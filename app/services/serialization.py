@@ -0,0 +1,122 @@
+import json
+from collections.abc import Sequence
+from itertools import chain
+
+from datetime import datetime
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import Row
+
+from schemas.user import ResponseFormat, UserDetailPayload, UserDetailSchema
+
+user_detail_adapter = TypeAdapter(UserDetailPayload)
+
+# Общие типы MessagePack тоже выбирают колоночный формат, двоичного варианта с объектами нет
+RESPONSE_FORMATS = {
+    **{response_format.value: response_format for response_format in ResponseFormat},
+    "application/msgpack": ResponseFormat.COLUMNAR_MSGPACK,
+    "application/x-msgpack": ResponseFormat.COLUMNAR_MSGPACK,
+    "application/*": ResponseFormat.JSON,
+    "*/*": ResponseFormat.JSON,
+}
+
+
+def _float_matches_json_module(value: float) -> bool:
+    """Совпадает ли запись числа у pydantic и у модуля json.
+
+    За пределами 1e-4 <= |x| < 1e16 записи расходятся: json пишет 1e-05 и 1e+16, а pydantic 0.00001 и 1e16,
+    inf и nan json не сериализует вовсе.
+    """
+    return value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def _render_like_json_response(content: UserDetailSchema) -> bytes:
+    # Так же, как JSONResponse сериализует response_model
+    return json.dumps(
+        content.model_dump(mode="json"), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def dump_user_detail(user: Row, history: dict[str, Sequence[Row]]) -> bytes:
+    """JSON ответа UserDetailSchema из строк базы без моделей на каждую запись.
+
+    Байты совпадают с ответом через response_model=UserDetailSchema, для редких значений,
+    которые pydantic записывает иначе, используется медленный путь.
+    """
+    payload: UserDetailPayload = {
+        "phone_number": user.phone_number,
+        "username": user.username,
+        "height": user.height,
+        "steps": [{"steps_count": value, "recorded_at": recorded_at} for value, recorded_at in history["steps"]],
+        "weight": [{"weight": value, "recorded_at": recorded_at} for value, recorded_at in history["weight"]],
+        "water": [{"water_amount": value, "recorded_at": recorded_at} for value, recorded_at in history["water"]],
+    }
+
+    float_values = chain(history["weight"], history["water"])
+    if not all(_float_matches_json_module(value) for value, _ in float_values):
+        return _render_like_json_response(UserDetailSchema.model_validate(payload))
+
+    return user_detail_adapter.dump_json(payload)
+
+
+def negotiate_response_format(accept: str | None) -> ResponseFormat:
+    """Выбор формата ответа по заголовку Accept с учетом q, по умолчанию JSON."""
+    if not accept:
+        return ResponseFormat.JSON
+
+    best, best_quality = ResponseFormat.JSON, 0.0
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        response_format = RESPONSE_FORMATS.get(media_type.lower())
+        if response_format is None:
+            continue
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best, best_quality = response_format, quality
+    return best
+
+
+def metric_series(rows: Sequence[tuple[int | float, datetime]]) -> dict[str, list]:
+    """История метрики параллельными массивами, время в целых секундах Unix epoch."""
+    return {
+        "timestamps": [int(recorded_at.timestamp()) for _, recorded_at in rows],
+        "values": [value for value, _ in rows],
+    }
+
+
+def encode_columnar(payload: dict, response_format: ResponseFormat) -> bytes:
+    """Кодирование колоночного ответа в JSON или MessagePack."""
+    if response_format == ResponseFormat.COLUMNAR_MSGPACK:
+        import msgpack
+
+        return msgpack.packb(payload)
+    return to_json(payload)
+
+
+def render_user_detail(user: Row, history: dict[str, Sequence[Row]], response_format: ResponseFormat) -> bytes:
+    """Ответ /me в выбранном формате."""
+    if response_format == ResponseFormat.JSON:
+        return dump_user_detail(user, history)
+    payload = {
+        "phone_number": user.phone_number,
+        "username": user.username,
+        "height": user.height,
+        **{record_type: metric_series(rows) for record_type, rows in history.items()},
+    }
+    return encode_columnar(payload, response_format)
+
+
+def render_records_page(
+    rows: Sequence[tuple[int | float, datetime]], next_cursor: str | None, response_format: ResponseFormat,
+) -> bytes:
+    """Страница истории метрики в колоночном формате."""
+    return encode_columnar({**metric_series(rows), "next_cursor": next_cursor}, response_format)
@@ -1,50 +1,165 @@
+import base64
+import csv
+import io
+import json
+import uuid
+from collections.abc import AsyncIterator
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from repositories.user_repository import UserRepository
-from integrations.smsru.client import SmsRuClient
+from models.user import StepRecord, WaterIntakeRecord, WeightRecord
+from repositories.otp_store import OtpStore, get_otp_store
+from core.cache import username_cache
+from repositories.user_repository import UserRepository, UsernameTakenError, normalize_username
+from integrations.smsru.client import SmsRuClient, get_smsru_client
+from services.call_dispatcher import CallDispatcher, get_call_dispatcher
+from services.serialization import render_user_detail
 from datetime import timedelta
 from datetime import datetime, timezone
-from core.config import Settings, get_app_settings
+from core.config import get_app_settings
+from core.executor import get_cpu_executor
 from jose import jwt
+from pydantic import TypeAdapter, ValidationError
 from schemas.user import (
     UserSchema,
     UserVerifyResponseSchema,
     UserDetailSchema,
+    UserSyncSchema,
     UserStepsSchema,
     UserWeightSchema,
     UserWaterSchema,
     UserUpdateSchema,
+    UserStepsPageSchema,
+    UserWeightPageSchema,
+    UserWaterPageSchema,
+    BatchRecordSchema,
+    BatchRecordErrorSchema,
+    UserRecordsBatchResponseSchema,
+    ExportFormat,
+    CallJobStatusSchema,
+    ResponseFormat,
 )
 
-app_settings: Settings = get_app_settings()
+batch_records_adapter = TypeAdapter(list[BatchRecordSchema])
+
+
+def validate_batch_records(records: list[dict]) -> tuple[list[BatchRecordSchema], list[BatchRecordErrorSchema]]:
+    """Валидация пакета записей целиком.
+
+    Если в пакете есть невалидные записи, они отбрасываются по индексам из ошибок,
+    а оставшиеся валидируются повторно одним вызовом.
+    """
+    try:
+        return batch_records_adapter.validate_python(records), []
+    except ValidationError as ex:
+        errors: dict[int, str] = {}
+        for error in ex.errors():
+            errors.setdefault(error["loc"][0], error["msg"])
+
+    valid_records = batch_records_adapter.validate_python(
+        [record for index, record in enumerate(records) if index not in errors]
+    )
+    return valid_records, [BatchRecordErrorSchema(index=index, detail=detail) for index, detail in errors.items()]
+
+
+def encode_jwt(subject: str, is_refresh: bool, expires_at: datetime) -> str:
+    """Подпись токена, объявлена на уровне модуля, чтобы выполняться и в пуле процессов."""
+    app_settings = get_app_settings()
+    jwt_key = app_settings.jwt_refresh_secret_key if is_refresh else app_settings.jwt_secret_key
+    return jwt.encode({"exp": expires_at, "sub": subject}, jwt_key, app_settings.jwt_algorithm)
+
+
+def encode_cursor(recorded_at: datetime, record_id: uuid.UUID) -> str:
+    """Кодирование ключа последней записи страницы в непрозрачный курсор."""
+    raw = f"{recorded_at.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Раскодирование курсора страницы.
+
+    Raises
+    ------
+        ValueError: Курсор поврежден.
+
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        recorded_at, record_id = raw.split("|")
+        return datetime.fromisoformat(recorded_at), uuid.UUID(record_id)
+    except (ValueError, UnicodeDecodeError) as ex:
+        raise ValueError("Invalid cursor") from ex
+
+
+def encode_sync_cursor(change_seq: int) -> str:
+    """Кодирование номера изменения пользователя в непрозрачный курсор синхронизации."""
+    return base64.urlsafe_b64encode(f"v1|{change_seq}".encode()).decode().rstrip("=")
+
+
+def decode_sync_cursor(cursor: str) -> int:
+    """Раскодирование курсора синхронизации.
+
+    Raises
+    ------
+        ValueError: Курсор поврежден.
+
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        version, change_seq = raw.split("|")
+        if version != "v1" or not change_seq.isdigit():
+            raise ValueError("Invalid sync cursor")
+        return int(change_seq)
+    except (ValueError, UnicodeDecodeError) as ex:
+        raise ValueError("Invalid sync cursor") from ex
 
 
 class UserService:
     """Сервис для работы с пользователями"""
 
-    def __init__(self, db_session: AsyncSession) -> None:
-        self.user_repository = UserRepository(db_session=db_session)
-        self.smsru_client: SmsRuClient = SmsRuClient()
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        read_session: AsyncSession | None = None,
+        otp_store: OtpStore | None = None,
+        smsru_client: SmsRuClient | None = None,
+        call_dispatcher: CallDispatcher | None = None,
+    ) -> None:
+        self.user_repository = UserRepository(db_session=db_session, read_session=read_session)
+        self.otp_store = otp_store or get_otp_store()
+        self.smsru_client = smsru_client or get_smsru_client()
+        self.call_dispatcher = call_dispatcher or get_call_dispatcher()
 
     async def check_if_username_exists(self, username: str) -> bool:
-        """Метод для проверки существует ли пользователь в базе с таким никнеймом."""
-        user = await self.user_repository.get_user_by_username(username=username)
-        return user is not None
+        """Метод для проверки существует ли пользователь в базе с таким никнеймом.
+
+        Ответ кешируется: занятый никнейм на username_taken_ttl_seconds, свободный на username_available_ttl_seconds.
+        При переименовании и удалении пользователя прежний никнейм удаляется из кеша этого воркера,
+        другие воркеры могут считать его занятым до истечения ttl. Ошибка в пользу свободного
+        безопасна: занять никнейм все равно не даст уникальный индекс.
+        """
+        key = normalize_username(username)
+        is_taken = username_cache.get(key)
+        if is_taken is None:
+            is_taken = await self.user_repository.is_username_taken(username=username)
+            username_cache.set(key, is_taken, ttl=None if is_taken else get_app_settings().username_available_ttl_seconds)
+        return is_taken
 
     async def update_user_info(self, phone_number: str, data: UserUpdateSchema) -> UserDetailSchema:
-        """Метод для обновления полей пользователя."""
-        update_data = data.dict(exclude_unset=True)
-        updated_user = await self.user_repository.update_user_info(phone_number, update_data)
-
-        steps = [
-            UserStepsSchema(steps_count=step.steps_count, recorded_at=step.recorded_at)
-            for step in updated_user.step_records]
-        weight = [
-            UserWeightSchema(weight=weight_record.weight, recorded_at=weight_record.recorded_at)
-            for weight_record in updated_user.weight_records]
-        water = [
-            UserWaterSchema(water_amount=water_record.water_amount, recorded_at=water_record.recorded_at)
-            for water_record in updated_user.water_intake_records
-        ]
+        """Метод для обновления полей пользователя.
+
+        Возвращает профиль пользователя и только те записи, которые были добавлены этим запросом.
+
+        Raises
+        ------
+            UsernameTakenError: Никнейм занят другим пользователем.
+
+        """
+        update_data = data.model_dump(exclude_unset=True)
+        updated_user, inserted = await self.user_repository.update_user_info(phone_number, update_data)
+
+        steps = [UserStepsSchema(**inserted["steps"]._mapping)] if "steps" in inserted else []
+        weight = [UserWeightSchema(**inserted["weight"]._mapping)] if "weight" in inserted else []
+        water = [UserWaterSchema(**inserted["water"]._mapping)] if "water" in inserted else []
 
         return UserDetailSchema(
             phone_number=updated_user.phone_number,
@@ -55,29 +170,175 @@ class UserService:
             water=water
         )
 
-    async def get_full_info_about_user(self, phone_number: str) -> UserDetailSchema:
-        """Метод для получения полной информации о пользователе."""
-        user_data = await self.user_repository.get_user_full_data(phone_number=phone_number)
+    async def get_full_info_about_user_content(
+        self, phone_number: str, days: int | None = None, response_format: ResponseFormat = ResponseFormat.JSON,
+    ) -> bytes | None:
+        """Метод для получения полной информации о пользователе сразу в виде тела ответа.
 
-        steps = [UserStepsSchema(steps_count=step.steps_count, recorded_at=step.recorded_at) for step in
-                 user_data.step_records]
-        weight = [UserWeightSchema(weight=weight_record.weight, recorded_at=weight_record.recorded_at) for weight_record
-                  in user_data.weight_records]
-        water = [UserWaterSchema(water_amount=water_record.water_amount, recorded_at=water_record.recorded_at) for
-                 water_record in user_data.water_intake_records]
+        JSON совпадает с UserDetailSchema, но строится из строк базы без моделей на каждую запись.
+        Вернет None если пользователь не найден.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+        user_history = await self.user_repository.get_user_history_rows(phone_number=phone_number, since=since)
+        if user_history is None:
+            return None
+        # Разбор большой истории занимает миллисекунды и уходит в пул, чтобы не задерживать остальные запросы
+        user, history = user_history
+        return await get_cpu_executor().run_sized(
+            sum(len(rows) for rows in history.values()),
+            get_app_settings().offload_min_history_records,
+            render_user_detail,
+            user,
+            history,
+            response_format=response_format,
+        )
 
-        return UserDetailSchema(
-            phone_number=user_data.phone_number,
-            username=user_data.username,
-            height=user_data.height,
-            steps=steps,
-            weight=weight,
-            water=water
+    async def get_changes(self, phone_number: str, cursor: str | None) -> UserSyncSchema | None:
+        """Метод для получения записей, добавленных после курсора, и курсора следующей синхронизации.
+
+        Без курсора возвращается вся история. Вернет None если пользователь не найден.
+        """
+        after_seq = decode_sync_cursor(cursor) if cursor else 0
+        changes = await self.user_repository.get_changes_since(phone_number=phone_number, after_seq=after_seq)
+        if changes is None:
+            return None
+
+        change_seq, records = changes
+        return UserSyncSchema(
+            steps=[UserStepsSchema(steps_count=value, recorded_at=recorded_at) for value, recorded_at in records["steps"]],
+            weight=[UserWeightSchema(weight=value, recorded_at=recorded_at) for value, recorded_at in records["weight"]],
+            water=[
+                UserWaterSchema(water_amount=value, recorded_at=recorded_at) for value, recorded_at in records["water"]
+            ],
+            cursor=encode_sync_cursor(max(change_seq, after_seq)),
+        )
+
+    async def add_records_batch(self, phone_number: str, records: list[dict]) -> UserRecordsBatchResponseSchema:
+        """Метод для сохранения пакета записей с носимых устройств."""
+        valid_records, errors = await get_cpu_executor().run_sized(
+            len(records), get_app_settings().offload_min_batch_records, validate_batch_records, records,
+        )
+
+        grouped: dict[str, list[dict]] = {"steps": [], "weight": [], "water": []}
+        for record in valid_records:
+            grouped[record.type].append(record.model_dump(exclude={"type"}))
+
+        saved = await self.user_repository.add_records_batch(phone_number=phone_number, **grouped)
+        accepted = len(valid_records) if saved else 0
+
+        return UserRecordsBatchResponseSchema(
+            accepted=accepted,
+            rejected=len(records) - accepted,
+            errors=errors,
         )
 
-    async def get_user_by_phone_number(self, phone_number: str) -> UserSchema | None:
+    async def export_history(self, phone_number: str, export_format: ExportFormat) -> AsyncIterator[bytes]:
+        """Метод для потоковой выгрузки всей истории пользователя порциями.
+
+        NDJSON выгружается в том же формате, что принимает пакетная загрузка записей.
+        """
+        value_fields = {"steps": "steps_count", "weight": "weight", "water": "water_amount"}
+
+        if export_format == ExportFormat.CSV:
+            yield b"type,value,recorded_at\r\n"
+
+        async for record_type, rows in self.user_repository.stream_records(phone_number=phone_number):
+            if export_format == ExportFormat.CSV:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows((record_type, value, recorded_at.isoformat()) for value, recorded_at in rows)
+                yield buffer.getvalue().encode()
+            else:
+                value_field = value_fields[record_type]
+                yield "".join(
+                    json.dumps({"type": record_type, value_field: value, "recorded_at": recorded_at.isoformat()}) + "\n"
+                    for value, recorded_at in rows
+                ).encode()
+
+    async def _get_records_page(
+        self,
+        record_model,
+        phone_number: str,
+        date_from: datetime | None,
+        date_to: datetime | None,
+        cursor: str | None,
+        limit: int,
+    ) -> tuple[list, str | None]:
+        """Получение страницы записей и курсора следующей страницы."""
+        records = await self.user_repository.get_records_page(
+            record_model=record_model,
+            phone_number=phone_number,
+            date_from=date_from,
+            date_to=date_to,
+            after=decode_cursor(cursor) if cursor else None,
+            limit=limit + 1,
+        )
+        if len(records) <= limit:
+            return records, None
+
+        records = records[:limit]
+        return records, encode_cursor(records[-1].recorded_at, records[-1].id)
+
+    async def get_steps_page(
+        self,
+        phone_number: str,
+        date_from: datetime | None,
+        date_to: datetime | None,
+        cursor: str | None,
+        limit: int,
+    ) -> UserStepsPageSchema:
+        """Метод для получения истории шагов за период."""
+        records, next_cursor = await self._get_records_page(
+            StepRecord, phone_number, date_from, date_to, cursor, limit,
+        )
+        return UserStepsPageSchema(
+            items=[UserStepsSchema(steps_count=step.steps_count, recorded_at=step.recorded_at) for step in records],
+            next_cursor=next_cursor,
+        )
+
+    async def get_weight_page(
+        self,
+        phone_number: str,
+        date_from: datetime | None,
+        date_to: datetime | None,
+        cursor: str | None,
+        limit: int,
+    ) -> UserWeightPageSchema:
+        """Метод для получения истории веса за период."""
+        records, next_cursor = await self._get_records_page(
+            WeightRecord, phone_number, date_from, date_to, cursor, limit,
+        )
+        return UserWeightPageSchema(
+            items=[
+                UserWeightSchema(weight=weight_record.weight, recorded_at=weight_record.recorded_at)
+                for weight_record in records
+            ],
+            next_cursor=next_cursor,
+        )
+
+    async def get_water_page(
+        self,
+        phone_number: str,
+        date_from: datetime | None,
+        date_to: datetime | None,
+        cursor: str | None,
+        limit: int,
+    ) -> UserWaterPageSchema:
+        """Метод для получения истории выпитой воды за период."""
+        records, next_cursor = await self._get_records_page(
+            WaterIntakeRecord, phone_number, date_from, date_to, cursor, limit,
+        )
+        return UserWaterPageSchema(
+            items=[
+                UserWaterSchema(water_amount=water_record.water_amount, recorded_at=water_record.recorded_at)
+                for water_record in records
+            ],
+            next_cursor=next_cursor,
+        )
+
+    async def get_user_by_phone_number(self, phone_number: str, primary: bool = False) -> UserSchema | None:
         """Метод для получения пользователя по номеру телефона."""
-        user = await self.user_repository.get_user_by_phone_number(phone_number=phone_number)
+        user = await self.user_repository.get_user_by_phone_number(phone_number=phone_number, primary=primary)
         return UserSchema.from_orm(user) if user else None
 
     async def create_user_by_phone_number(self, phone_number: str) -> UserSchema:
@@ -85,24 +346,28 @@ class UserService:
         user = await self.user_repository.create_user_by_phone_number(phone_number=phone_number)
         return UserSchema.from_orm(user)
 
-    async def phone_call(self, phone_number: str) -> bool:
-        """Метод для запроса звонка на номер телефона."""
-        async with SmsRuClient() as client:
-            last_4_digits: str = await client.make_phone_call(phone_number=phone_number)
+    async def phone_call(self, phone_number: str) -> str:
+        """Метод для запроса звонка на номер телефона, звонок выполняется в фоне.
+
+        Вернет идентификатор задачи, по которому можно узнать статус звонка.
+        """
+        return self.call_dispatcher.enqueue(phone_number=phone_number)
 
-        await self.user_repository.create_phone_code_row(phone_number=phone_number, last_4_digits=last_4_digits)
-        return True
+    async def get_call_status(self, job_id: str) -> CallJobStatusSchema | None:
+        """Метод для получения статуса звонка."""
+        return self.call_dispatcher.get_status(job_id=job_id)
 
     async def verify_code(self, phone_number: str, code: str) -> UserVerifyResponseSchema:
         """Метод для проверки правильно введенного кода."""
-        is_valid = await self.user_repository.check_code(phone_number=phone_number, code=code)
+        is_valid = await self.otp_store.consume(phone_number=phone_number, code=code)
         if not is_valid:
             return UserVerifyResponseSchema(
                 success=False,
                 error="Invalid code",
             )
 
-        user: UserSchema | None = await self.get_user_by_phone_number(phone_number=phone_number)
+        # Чтение из основной базы, иначе отставшая реплика приведет к созданию дубликата
+        user: UserSchema | None = await self.get_user_by_phone_number(phone_number=phone_number, primary=True)
         if user:
             access_token = await self.create_jwt_token(subject=phone_number, is_refresh=False)
             refresh_token = await self.create_jwt_token(subject=phone_number, is_refresh=True)
@@ -123,14 +388,14 @@ class UserService:
 
     async def create_jwt_token(self, subject: str, is_refresh: bool, expires_delta: timedelta = None) -> str:
         """Метод для генерирования токена."""
+        app_settings = get_app_settings()
         expire_minutes = app_settings.refresh_token_expire_minutes if is_refresh else app_settings.access_token_expire_minutes
-        jwt_key = app_settings.jwt_refresh_secret_key if is_refresh else app_settings.jwt_secret_key
 
         if expires_delta:
             expires_delta = datetime.now(timezone.utc) + expires_delta
         else:
             expires_delta = datetime.now(timezone.utc) + timedelta(minutes=expire_minutes)
 
-        to_encode = {"exp": expires_delta, "sub": subject}
-        encoded_jwt = jwt.encode(to_encode, jwt_key, app_settings.jwt_algorithm)
-        return encoded_jwt
+        if app_settings.offload_jwt:
+            return await get_cpu_executor().run(encode_jwt, subject, is_refresh, expires_delta)
+        return encode_jwt(subject, is_refresh, expires_delta)
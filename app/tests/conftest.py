@@ -1,5 +1,6 @@
 import pytest
 import os
+import socket
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy import create_engine
 from models import Base
@@ -50,6 +51,22 @@ def check_postgres_responsive(docker_services):
     )
 
 
+def is_redis_responsive():
+    try:
+        with socket.create_connection(("localhost", 6379), timeout=1) as conn:
+            conn.sendall(b"PING\r\n")
+            return conn.recv(16).startswith(b"+PONG")
+    except OSError:
+        return False
+
+
+@pytest.fixture(scope="session")
+def check_redis_responsive(docker_services):
+    docker_services.wait_until_responsive(
+        timeout=30.0, pause=1.0, check=is_redis_responsive
+    )
+
+
 @pytest.fixture(scope="session")
 def postgresql(docker_services):
     """Запускает postgres перед тестами и останавливает после"""
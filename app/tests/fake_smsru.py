@@ -0,0 +1,54 @@
+"""Локальная замена sms ru для нагрузочных тестов очереди звонков.
+
+Отвечает как /code/call с настраиваемой задержкой и долей ошибок.
+Запуск отдельным процессом: python -m tests.fake_smsru --port 8081 --latency 0.2 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import random
+import string
+
+from aiohttp import web
+
+
+class FakeSmsRu:
+    """Состояние фейкового сервера: настройки ответов и счетчики запросов."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, fail_first: int = 0) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_call(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.requests <= self.fail_first or random.random() < self.error_rate:
+                return web.Response(status=503, text="Service Unavailable")
+            if not request.query.get("phone"):
+                return web.json_response({"status": "ERROR", "status_code": 202})
+            code = "".join(random.choice(string.digits) for _ in range(4))
+            return web.json_response({"status": "OK", "code": code, "call_id": str(self.requests)})
+        finally:
+            self.in_flight -= 1
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/code/call", self.handle_call)
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа в секундах.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 503, от 0 до 1.")
+    args = parser.parse_args()
+
+    web.run_app(FakeSmsRu(latency=args.latency, error_rate=args.error_rate).make_app(), port=args.port)
@@ -0,0 +1,63 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.exceptions import HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from core.admission import AdmissionControlMiddleware, AdmissionController, ConcurrencyLimiter, RouteClass
+from core.exception_handler import http_exception_handler
+
+
+def _make_app(controller: AdmissionController, release: asyncio.Event) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/user/me")
+    async def me():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/api/health/liveness")
+    async def liveness():
+        return {"status": "alive"}
+
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, prefix="/api")
+    app.add_exception_handler(HTTPException, http_exception_handler)  # type: ignore
+    return app
+
+
+async def test_requests_over_limit_are_shed_after_queue_timeout():
+    controller = AdmissionController(
+        limiters={RouteClass.READ: ConcurrencyLimiter(limit=1, queue_timeout=0.05)},
+        pool_waiting=lambda: 0,
+        pool_wait_threshold=10,
+        retry_after=2,
+    )
+    release = asyncio.Event()
+    app = _make_app(controller, release)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/api/user/me"))
+        await asyncio.sleep(0.01)
+        response = await client.get("/api/user/me")
+        release.set()
+        assert (await first).status_code == 200
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert response.json()["type"] == "service_unavailable"
+    assert controller.snapshot()["routes"]["read"]["shed"] == 1
+
+
+async def test_saturated_pool_sheds_everything_but_liveness():
+    controller = AdmissionController(limiters={}, pool_waiting=lambda: 50, pool_wait_threshold=10)
+    release = asyncio.Event()
+    release.set()
+    app = _make_app(controller, release)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        shed = await client.get("/api/user/me")
+        alive = await client.get("/api/health/liveness")
+
+    assert shed.status_code == 503
+    assert "Retry-After" in shed.headers
+    assert alive.status_code == 200
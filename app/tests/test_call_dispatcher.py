@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from core.circuit_breaker import CircuitBreaker, CircuitState
+from integrations.smsru.client import SmsRuClient
+from repositories.otp_store import InMemoryOtpStore
+from schemas.user import CallJobStatus
+from services.call_dispatcher import CallDispatcher, CallDispatchUnavailableError
+from tests.fake_smsru import FakeSmsRu
+
+PHONE_NUMBER = "+79182294599"
+
+
+@pytest.fixture
+async def fake_smsru():
+    fake = FakeSmsRu()
+    server = TestServer(fake.make_app())
+    await server.start_server()
+
+    yield fake, str(server.make_url("/code/call"))
+
+    await server.close()
+
+
+async def _make_dispatcher(api_url: str, **kwargs) -> CallDispatcher:
+    client = SmsRuClient(api_url=api_url, api_id="test")
+    await client.start()
+    kwargs.setdefault("base_delay", 0.01)
+    kwargs.setdefault("max_delay", 0.05)
+    return CallDispatcher(client=client, otp_store=InMemoryOtpStore(ttl=60), **kwargs)
+
+
+async def _wait_finished(dispatcher: CallDispatcher, job_ids: list[str], timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        statuses = [dispatcher.get_status(job_id).status for job_id in job_ids]
+        if all(s in (CallJobStatus.SENT, CallJobStatus.FAILED) for s in statuses):
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError("Звонки не завершились")
+
+
+async def test_call_retried_until_sent(fake_smsru):
+    fake, api_url = fake_smsru
+    fake.fail_first = 2
+    dispatcher = await _make_dispatcher(api_url, max_retries=3)
+
+    job_id = dispatcher.enqueue(PHONE_NUMBER)
+    await _wait_finished(dispatcher, [job_id])
+
+    job = dispatcher.get_status(job_id)
+    assert job.status == CallJobStatus.SENT
+    assert job.attempts == 3
+    assert fake.requests == 3
+
+    await dispatcher.stop()
+    await dispatcher.client.close()
+
+
+async def test_open_circuit_fails_fast(fake_smsru):
+    fake, api_url = fake_smsru
+    fake.error_rate = 1.0
+    dispatcher = await _make_dispatcher(
+        api_url, max_retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60),
+    )
+
+    job_ids = [dispatcher.enqueue(PHONE_NUMBER) for _ in range(3)]
+    await _wait_finished(dispatcher, job_ids)
+
+    with pytest.raises(CallDispatchUnavailableError) as ex:
+        dispatcher.enqueue(PHONE_NUMBER)
+    assert ex.value.retry_after > 0
+    assert fake.requests == 3
+
+    await dispatcher.stop()
+    await dispatcher.client.close()
+
+
+async def test_concurrency_bounded_by_workers(fake_smsru):
+    fake, api_url = fake_smsru
+    fake.latency = 0.05
+    fake.error_rate = 0.2
+    dispatcher = await _make_dispatcher(
+        api_url, workers=5, max_retries=5, breaker=CircuitBreaker(failure_threshold=100, reset_timeout=1),
+    )
+
+    job_ids = [dispatcher.enqueue(PHONE_NUMBER) for _ in range(50)]
+    await _wait_finished(dispatcher, job_ids, timeout=30)
+
+    sent = [job_id for job_id in job_ids if dispatcher.get_status(job_id).status == CallJobStatus.SENT]
+    assert len(sent) >= 45
+    assert fake.max_in_flight <= 5
+
+    await dispatcher.stop()
+    await dispatcher.client.close()
+
+
+class BrokenSmsRuClient(SmsRuClient):
+    """Клиент, падающий с ошибкой, которую не описывает SmsRuError."""
+
+    async def make_phone_call(self, phone_number: str) -> str:
+        raise RuntimeError("unexpected")
+
+
+async def test_unexpected_error_ends_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    await asyncio.sleep(0.06)
+    dispatcher = CallDispatcher(
+        client=BrokenSmsRuClient(api_url="http://localhost:1/code/call", api_id="test"),
+        otp_store=InMemoryOtpStore(ttl=60),
+        breaker=breaker,
+    )
+
+    job_id = dispatcher.enqueue(PHONE_NUMBER)
+    await _wait_finished(dispatcher, [job_id])
+
+    assert dispatcher.get_status(job_id).status == CallJobStatus.FAILED
+    # Пробный вызов завершен неудачей: предохранитель снова открыт, а не ждет результата вечно
+    assert breaker.state == CircuitState.OPEN
+    await asyncio.sleep(0.06)
+    assert breaker.allow()
+
+    await dispatcher.stop()
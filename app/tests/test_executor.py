@@ -0,0 +1,121 @@
+import asyncio
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core.executor import CpuExecutor, LoopLagMonitor
+from core.security import app_settings, decode_token_offloaded, token_cache, verify_signature
+from schemas.user import ResponseFormat
+from services.serialization import render_user_detail
+from services.user_service import encode_jwt, validate_batch_records
+
+UserRow = namedtuple("UserRow", ["id", "phone_number", "username", "height"])
+
+START = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def _thread_id() -> int:
+    return threading.get_ident()
+
+
+def _history(count: int) -> dict[str, list[tuple]]:
+    moments = [START + timedelta(minutes=i) for i in range(count)]
+    return {
+        "steps": [(i, moment) for i, moment in enumerate(moments)],
+        "weight": [(70.5, moment) for moment in moments],
+        "water": [(0.25, moment) for moment in moments],
+    }
+
+
+async def test_run_sized_below_threshold_runs_inline():
+    executor = CpuExecutor("thread", workers=1)
+    try:
+        assert await executor.run_sized(9, 10, _thread_id) == threading.get_ident()
+        assert await executor.run_sized(10, 10, _thread_id) != threading.get_ident()
+    finally:
+        executor.shutdown()
+
+    snapshot = executor.snapshot()
+    assert (snapshot["inline"], snapshot["offloaded"]) == (1, 1)
+    assert snapshot["run_time"]["count"] == 1
+
+
+async def test_process_executor_runs_in_another_process():
+    executor = CpuExecutor("process", workers=1)
+    try:
+        assert await executor.run(os.getpid) != os.getpid()
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+async def test_offloaded_serialization_and_validation_match_inline(kind):
+    user = UserRow(1, "+79183394882", "user", 180)
+    history = _history(100)
+    records = [
+        {"type": "steps", "steps_count": 100, "recorded_at": START.isoformat()},
+        {"type": "pulse", "value": 60, "recorded_at": START.isoformat()},
+        {"type": "water", "water_amount": 0.3, "recorded_at": START.isoformat()},
+    ]
+
+    executor = CpuExecutor(kind, workers=1)
+    try:
+        rendered = await executor.run_sized(
+            300, 1, render_user_detail, user, history, response_format=ResponseFormat.JSON,
+        )
+        validated = await executor.run_sized(len(records), 1, validate_batch_records, records)
+    finally:
+        executor.shutdown()
+
+    assert rendered == render_user_detail(user, history, response_format=ResponseFormat.JSON)
+    assert validated == validate_batch_records(records)
+    assert [error.index for error in validated[1]] == [1]
+
+
+async def test_offloaded_jwt_roundtrip(monkeypatch):
+    monkeypatch.setattr(app_settings, "offload_jwt", True)
+    token_cache.clear()
+    executor = CpuExecutor("process", workers=1)
+    monkeypatch.setattr("core.security.get_cpu_executor", lambda: executor)
+    try:
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+        token = await executor.run(encode_jwt, "+79183394882", False, expires_at)
+        token_data = await decode_token_offloaded(token, is_refresh=False)
+    finally:
+        executor.shutdown()
+        token_cache.clear()
+
+    assert token_data.sub == "+79183394882"
+    assert executor.offloaded == 2
+    assert verify_signature(token, is_refresh=False)["sub"] == "+79183394882"
+
+
+async def test_loop_lag_monitor_measures_blocking():
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    # Синхронная работа в цикле задерживает все остальные задачи
+    time.sleep(0.1)
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+
+    assert monitor.max_lag >= 0.05
+    assert monitor.snapshot()["count"] >= 2
+
+
+async def test_offloading_keeps_loop_lag_low():
+    monitor = LoopLagMonitor(interval=0.01)
+    executor = CpuExecutor("thread", workers=1)
+    monitor.start()
+    try:
+        # time.sleep отпускает GIL, как и любая работа в пуле процессов
+        await executor.run(time.sleep, 0.1)
+    finally:
+        await monitor.stop()
+        executor.shutdown()
+
+    assert monitor.max_lag < 0.05
@@ -0,0 +1,25 @@
+from httpx import ASGITransport, AsyncClient
+
+from core.config import get_app_settings
+from main import get_application
+
+
+async def test_metrics_not_exposed_by_default():
+    assert get_app_settings().internal_metrics_enabled is False
+
+    application = get_application()
+    async with AsyncClient(transport=ASGITransport(app=application), base_url="http://test") as client:
+        response = await client.get("/api/internal/metrics")
+
+    assert response.status_code == 404
+
+
+async def test_metrics_exposed_when_enabled(monkeypatch):
+    monkeypatch.setattr(get_app_settings(), "internal_metrics_enabled", True)
+
+    application = get_application()
+    async with AsyncClient(transport=ASGITransport(app=application), base_url="http://test") as client:
+        response = await client.get("/api/internal/metrics")
+
+    assert response.status_code == 200
+    assert set(response.json()) >= {"worker", "pools", "executor", "loop_lag"}
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from repositories.otp_store import InMemoryOtpStore, RedisOtpStore
+
+REDIS_URL = "redis://localhost:6379/0"
+PHONE_NUMBER = "+79182294599"
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def otp_store(request):
+    if request.param == "redis":
+        request.getfixturevalue("check_redis_responsive")
+        store = RedisOtpStore(url=REDIS_URL, ttl=1, key_prefix="test:otp:")
+    else:
+        store = InMemoryOtpStore(ttl=1)
+
+    yield store
+
+    await store.close()
+
+
+async def test_code_is_consumed_once(otp_store):
+    await otp_store.save(phone_number=PHONE_NUMBER, code="1234")
+
+    assert await otp_store.consume(phone_number=PHONE_NUMBER, code="0000") is False
+    assert await otp_store.consume(phone_number=PHONE_NUMBER, code="1234") is True
+    assert await otp_store.consume(phone_number=PHONE_NUMBER, code="1234") is False
+
+
+async def test_new_code_replaces_previous(otp_store):
+    await otp_store.save(phone_number=PHONE_NUMBER, code="1111")
+    await otp_store.save(phone_number=PHONE_NUMBER, code="2222")
+
+    assert await otp_store.consume(phone_number=PHONE_NUMBER, code="1111") is False
+    assert await otp_store.consume(phone_number=PHONE_NUMBER, code="2222") is True
+
+
+async def test_code_expires(otp_store):
+    await otp_store.save(phone_number=PHONE_NUMBER, code="4321")
+    await asyncio.sleep(1.2)
+
+    assert await otp_store.consume(phone_number=PHONE_NUMBER, code="4321") is False
+
+
+async def test_concurrent_consume_succeeds_once(otp_store):
+    await otp_store.save(phone_number=PHONE_NUMBER, code="5555")
+
+    results = await asyncio.gather(
+        *(otp_store.consume(phone_number=PHONE_NUMBER, code="5555") for _ in range(10))
+    )
+    assert results.count(True) == 1
@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+from core.phone import normalize_phone_number
+from schemas.user import UserCallSchema, UserVerifySchema
+
+
+@pytest.mark.parametrize("phone_number", ["+79182773844", "+7 918 277-38-44", "89182773844", "8 (918) 277 38 44"])
+def test_phone_number_normalized_to_e164(phone_number):
+    assert normalize_phone_number(phone_number) == "+79182773844"
+
+
+@pytest.mark.parametrize("phone_number", ["", "not a number", "+7918"])
+def test_invalid_phone_number_rejected(phone_number):
+    with pytest.raises(ValueError):
+        normalize_phone_number(phone_number)
+
+
+def test_call_and_verify_schemas_store_canonical_number():
+    assert UserCallSchema(phone_number="8 918 277 38 44").phone_number == "+79182773844"
+    assert UserVerifySchema(phone_number="+7 918 277 38 44", code="0000").phone_number == "+79182773844"
+
+    with pytest.raises(ValidationError):
+        UserVerifySchema(phone_number="12345", code="0000")
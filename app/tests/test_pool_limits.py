@@ -0,0 +1,42 @@
+import pytest
+
+from core.config import Settings, pool_limits
+
+
+def test_pool_unchanged_without_budget():
+    settings = Settings(pool_size=20, pool_max_overflow=10, web_workers=4)
+
+    assert pool_limits(settings) == (20, 10)
+
+
+@pytest.mark.parametrize(
+    ("budget", "workers", "expected"),
+    [
+        (120, 4, (20, 10)),
+        (100, 4, (20, 5)),
+        (60, 4, (15, 0)),
+        (7, 2, (3, 0)),
+    ],
+)
+def test_pool_fits_worker_share_of_budget(budget, workers, expected):
+    settings = Settings(pool_size=20, pool_max_overflow=10, web_workers=workers, pg_connection_budget=budget)
+
+    pool_size, max_overflow = pool_limits(settings)
+
+    assert (pool_size, max_overflow) == expected
+    assert workers * (pool_size + max_overflow) <= budget
+
+
+def test_budget_below_one_connection_per_worker_rejected():
+    with pytest.raises(ValueError):
+        pool_limits(Settings(web_workers=8, pg_connection_budget=4))
+
+
+def test_multiple_workers_require_shared_otp_and_rate_limit_store():
+    from run import check_per_worker_state
+
+    with pytest.raises(ValueError):
+        check_per_worker_state(Settings(web_workers=2, otp_store_backend="memory", rate_limit_backend="redis"))
+    with pytest.raises(ValueError):
+        check_per_worker_state(Settings(web_workers=2, otp_store_backend="redis", rate_limit_backend="memory"))
+    check_per_worker_state(Settings(web_workers=2, otp_store_backend="redis", rate_limit_backend="redis"))
@@ -0,0 +1,153 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from core.config import get_app_settings
+from models.user import StepRecord, WaterIntakeRecord, WeightRecord
+from repositories.user_repository import UserRepository
+from tests.data.user import test_users_data
+
+settings = get_app_settings()
+
+PHONE_NUMBER = test_users_data[0]["phone_number"]
+NEW_PHONE_NUMBER = "+79990000000"
+RECORDS_PER_USER = 200
+
+
+async def _consume(stream) -> None:
+    async for _ in stream:
+        pass
+
+
+# Все запросы репозитория, план которых проверяется на отсутствие seq scan.
+# Изменяющие методы выполняются в транзакции, которая откатывается после EXPLAIN
+REPOSITORY_CALLS = {
+    "get_user_by_phone_number": lambda repo: repo.get_user_by_phone_number(phone_number=PHONE_NUMBER),
+    "is_username_taken": lambda repo: repo.is_username_taken(username="Plan_User"),
+    "get_records_page": lambda repo: repo.get_records_page(
+        record_model=StepRecord, phone_number=PHONE_NUMBER, date_from=None, date_to=None, after=None, limit=50,
+    ),
+    "get_records_page_after_cursor": lambda repo: repo.get_records_page(
+        record_model=WeightRecord,
+        phone_number=PHONE_NUMBER,
+        date_from=datetime.now(timezone.utc) - timedelta(days=30),
+        date_to=datetime.now(timezone.utc),
+        after=(datetime.now(timezone.utc) - timedelta(days=3), uuid.UUID(int=0)),
+        limit=50,
+    ),
+    "get_user_history_rows": lambda repo: repo.get_user_history_rows(phone_number=PHONE_NUMBER),
+    "get_user_history_rows_since": lambda repo: repo.get_user_history_rows(
+        phone_number=PHONE_NUMBER, since=datetime.now(timezone.utc) - timedelta(days=7),
+    ),
+    "stream_records": lambda repo: _consume(repo.stream_records(phone_number=PHONE_NUMBER, chunk_size=50)),
+    "get_changes_since": lambda repo: repo.get_changes_since(phone_number=PHONE_NUMBER, after_seq=0),
+    "update_user_info": lambda repo: repo.update_user_info(
+        phone_number=PHONE_NUMBER,
+        update_data={"height": 180, "steps": {"steps_count": 10, "recorded_at": datetime.now(timezone.utc)}},
+    ),
+    "add_records_batch": lambda repo: repo.add_records_batch(
+        phone_number=PHONE_NUMBER,
+        steps=[{"steps_count": 10, "recorded_at": datetime.now(timezone.utc)}],
+        weight=[{"weight": 70.5, "recorded_at": datetime.now(timezone.utc)}],
+        water=[{"water_amount": 0.3, "recorded_at": datetime.now(timezone.utc)}],
+    ),
+    "soft_delete_user": lambda repo: repo.soft_delete_user(phone_number=PHONE_NUMBER),
+    "create_user_by_phone_number": lambda repo: repo.create_user_by_phone_number(phone_number=NEW_PHONE_NUMBER),
+    "create_existing_user_by_phone_number": lambda repo: repo.create_user_by_phone_number(phone_number=PHONE_NUMBER),
+}
+
+
+def _plan_nodes(plan: dict):
+    """Обход всех узлов плана запроса."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@pytest.fixture(scope="session")
+async def plan_engine(fill_test_data):
+    """Движок к тестовой базе, заполненной историей для всех тестовых пользователей."""
+    pg_connection_string = (
+        f"postgresql+asyncpg://{settings.pg_username}:{settings.pg_password}@"
+        f"{settings.pg_host}:{settings.pg_port}/{settings.pg_database}"
+    )
+    engine = create_async_engine(pg_connection_string)
+
+    now = datetime.now(timezone.utc)
+    async with engine.begin() as conn:
+        for model, value_field in (
+            (StepRecord, "steps_count"),
+            (WeightRecord, "weight"),
+            (WaterIntakeRecord, "water_amount"),
+        ):
+            await conn.execute(
+                insert(model),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "user_id": data["id"],
+                        value_field: i,
+                        "recorded_at": now - timedelta(hours=i),
+                    }
+                    for data in test_users_data
+                    for i in range(RECORDS_PER_USER)
+                ],
+            )
+        await conn.execute(text("ANALYZE"))
+
+    yield engine
+
+    await engine.dispose()
+
+
+async def _explain_repository_call(engine, call) -> list[tuple[str, dict]]:
+    """Выполняет метод репозитория и возвращает планы всех запросов, которые он отправил в базу.
+
+    Метод и EXPLAIN выполняются в одной внешней транзакции, которая затем откатывается:
+    commit репозитория только освобождает точку сохранения, и тестовые данные не меняются.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    plans = []
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+                async with session:
+                    await call(UserRepository(db_session=session))
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+            # Без seq scan планировщик выберет индекс, если он вообще применим к запросу
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            for statement, parameters in statements:
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                explain = result.scalar()
+                if isinstance(explain, str):
+                    explain = json.loads(explain)
+                plans.append((statement, explain[0]["Plan"]))
+        finally:
+            await transaction.rollback()
+
+    return plans
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize("method", REPOSITORY_CALLS)
+async def test_repository_query_uses_index(plan_engine, method):
+    plans = await _explain_repository_call(plan_engine, REPOSITORY_CALLS[method])
+    assert plans, f"{method} не отправил ни одного запроса"
+
+    for statement, plan in plans:
+        seq_scans = [node["Relation Name"] for node in _plan_nodes(plan) if node["Node Type"] == "Seq Scan"]
+        assert not seq_scans, f"{method}: seq scan по {seq_scans}\n{statement}"
@@ -0,0 +1,71 @@
+import asyncio
+import uuid
+
+import pytest
+
+from core.config import RateLimitPolicy
+from core.rate_limit import InMemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend
+
+REDIS_URL = "redis://localhost:6379/0"
+
+ALGORITHMS = ["sliding_window", "token_bucket"]
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request):
+    if request.param == "redis":
+        request.getfixturevalue("check_redis_responsive")
+        backend = RedisRateLimitBackend(url=REDIS_URL, key_prefix=f"test:ratelimit:{uuid.uuid4()}:")
+    else:
+        backend = InMemoryRateLimitBackend()
+
+    yield backend
+
+    await backend.close()
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+async def test_requests_over_limit_rejected(backend, algorithm):
+    policy = RateLimitPolicy(algorithm=algorithm, limit=3, period=60)
+
+    results = [await backend.hit("phone", policy) for _ in range(4)]
+
+    assert results[:3] == [0, 0, 0]
+    assert 0 < results[3] <= 120
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+async def test_keys_limited_independently(backend, algorithm):
+    policy = RateLimitPolicy(algorithm=algorithm, limit=1, period=60)
+
+    assert await backend.hit("first", policy) == 0
+    assert await backend.hit("second", policy) == 0
+    assert await backend.hit("first", policy) > 0
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+async def test_limit_recovers_after_retry_after(backend, algorithm):
+    policy = RateLimitPolicy(algorithm=algorithm, limit=2, period=0.5)
+
+    await backend.hit("phone", policy)
+    await backend.hit("phone", policy)
+    retry_after = await backend.hit("phone", policy)
+    assert retry_after > 0
+
+    await asyncio.sleep(retry_after + 0.05)
+    assert await backend.hit("phone", policy) == 0
+
+
+async def test_limiter_applies_every_route_policy():
+    limiter = RateLimiter(
+        backend=InMemoryRateLimitBackend(),
+        policies={
+            "verify:phone": RateLimitPolicy(limit=2, period=60),
+            "verify:ip": RateLimitPolicy(algorithm="token_bucket", limit=100, period=60),
+        },
+    )
+
+    assert await limiter.check("verify", phone="+79182294599", ip="10.0.0.1") == 0
+    assert await limiter.check("verify", phone="+79182294599", ip="10.0.0.2") == 0
+    assert await limiter.check("verify", phone="+79182294599", ip="10.0.0.3") > 0
+    assert await limiter.check("call", phone="+79182294599", ip="10.0.0.3") == 0
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from core.config import get_app_settings
+from core.replicas import ReplicaRouter, recent_writers
+from repositories.user_repository import LoadProfile, UserRepository
+from tests.data.user import test_users_data
+
+settings = get_app_settings()
+
+PRIMARY_HOST = f"{settings.pg_host}:{settings.pg_port}"
+REPLICA_HOST = "localhost:5433"
+UNREACHABLE_HOST = "localhost:1"
+
+
+def make_engine(host: str):
+    return create_async_engine(
+        f"postgresql+asyncpg://{settings.pg_username}:{settings.pg_password}@{host}/{settings.pg_database}"
+    )
+
+
+def is_replica_responsive():
+    pg_connection_string = (
+        f"postgresql+psycopg2://{settings.pg_username}:{settings.pg_password}@"
+        f"{REPLICA_HOST}/{settings.pg_database}"
+    )
+    try:
+        engine = create_engine(pg_connection_string)
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT pg_is_in_recovery()")).scalar()
+    except Exception:
+        return False
+
+
+@pytest.fixture(scope="session")
+def check_replica_responsive(docker_services, check_postgres_responsive):
+    docker_services.wait_until_responsive(
+        timeout=60.0, pause=1.0, check=is_replica_responsive
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_router_chooses_healthy_replica(check_replica_responsive):
+    replica = make_engine(REPLICA_HOST)
+    router = ReplicaRouter(engines=[replica], max_lag_seconds=5, check_interval=60)
+
+    assert await router.choose() is replica
+
+    await replica.dispose()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_router_skips_unavailable_replica(check_replica_responsive):
+    unavailable = make_engine(UNREACHABLE_HOST)
+    replica = make_engine(REPLICA_HOST)
+
+    router = ReplicaRouter(engines=[unavailable, replica], max_lag_seconds=5, check_interval=60)
+    for _ in range(3):
+        assert await router.choose() is replica
+
+    router = ReplicaRouter(engines=[unavailable], max_lag_seconds=5, check_interval=60)
+    assert await router.choose() is None
+
+    await unavailable.dispose()
+    await replica.dispose()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_router_skips_lagging_replica(check_replica_responsive):
+    replica = make_engine(REPLICA_HOST)
+    # Любое отставание, даже нулевое, больше допустимого
+    router = ReplicaRouter(engines=[replica], max_lag_seconds=-1, check_interval=60)
+
+    assert await router.choose() is None
+
+    await replica.dispose()
+
+
+class ScriptedRouter(ReplicaRouter):
+    """Роутер, у которого проверка реплики возвращает заданное отставание или зависает."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.lag: float | None = 0.0
+        self.hang = False
+
+    async def _probe(self, engine) -> float | None:
+        if self.hang:
+            await asyncio.sleep(60)
+        return self.lag
+
+
+async def test_router_skips_replica_without_wal_receiver():
+    replica = make_engine(REPLICA_HOST)
+    router = ScriptedRouter(engines=[replica], max_lag_seconds=5, check_interval=60)
+    router.lag = None
+
+    assert await router.choose() is None
+
+
+async def test_hanging_probe_times_out():
+    replica = make_engine(REPLICA_HOST)
+    router = ScriptedRouter(engines=[replica], max_lag_seconds=5, check_interval=60, check_timeout=0.05)
+    router.hang = True
+
+    started = time.monotonic()
+    assert await router.choose() is None
+    assert time.monotonic() - started < 1
+
+
+async def test_choose_does_not_wait_for_refresh():
+    replica = make_engine(REPLICA_HOST)
+    router = ScriptedRouter(engines=[replica], max_lag_seconds=5, check_interval=0, check_timeout=0.2)
+    assert await router.choose() is replica
+
+    # Следующая проверка зависает, а запросы получают последний результат сразу
+    router.hang = True
+    started = time.monotonic()
+    assert await router.choose() is replica
+    assert await router.choose() is replica
+    assert time.monotonic() - started < 0.1
+
+    await asyncio.sleep(0.3)
+    assert await router.choose() is None
+    await router.close()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_reads_see_own_writes(fill_test_data, check_replica_responsive):
+    primary = make_engine(PRIMARY_HOST)
+    replica = make_engine(REPLICA_HOST)
+    phone_number = test_users_data[1]["phone_number"]
+    recent_writers.pop(phone_number)
+
+    async with async_sessionmaker(primary, expire_on_commit=False)() as db, \
+            async_sessionmaker(replica, expire_on_commit=False)() as read_db:
+        repository = UserRepository(db_session=db, read_session=read_db)
+        assert repository._reader(phone_number) is read_db
+
+        await repository.update_user_info(phone_number=phone_number, update_data={"height": 181})
+        assert repository._reader(phone_number) is db
+
+        user = await repository.get_user_by_phone_number(phone_number=phone_number, profile=LoadProfile.PROFILE)
+        assert user.height == 181
+
+        # Следующий запрос того же пользователя тоже читает из основной базы, пока реплика догоняет запись
+        next_repository = UserRepository(db_session=db, read_session=read_db)
+        assert next_repository._reader(phone_number) is db
+        assert next_repository._reader(test_users_data[2]["phone_number"]) is read_db
+
+    await primary.dispose()
+    await replica.dispose()
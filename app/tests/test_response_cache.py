@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from core.response_cache import ResponseCache, etag_matches, make_etag
+
+PHONE_NUMBER = "+79182294599"
+VARIANT = (None, "application/json")
+
+
+class Loader:
+    """Загрузчик ответа, считающий вызовы и умеющий имитировать недоступность базы."""
+
+    def __init__(self, content: bytes = b"{}") -> None:
+        self.content = content
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("database is unavailable")
+        return self.content
+
+
+async def test_repeated_calls_served_from_cache():
+    cache = ResponseCache(max_bytes=1024, ttl=60)
+    loader = Loader()
+
+    for _ in range(3):
+        assert (await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)).content == b"{}"
+
+    assert loader.calls == 1
+    assert cache.snapshot()["hits"] == 2
+    assert cache.snapshot()["misses"] == 1
+
+
+async def test_invalidate_drops_every_variant():
+    cache = ResponseCache(max_bytes=1024, ttl=60)
+    loader = Loader()
+    await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)
+    await cache.get_or_load(PHONE_NUMBER, (7, "application/json"), loader, loader)
+
+    cache.invalidate(PHONE_NUMBER)
+    await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)
+
+    assert loader.calls == 3
+
+
+async def test_response_loaded_before_invalidation_not_stored():
+    cache = ResponseCache(max_bytes=1024, ttl=60)
+    loader = Loader()
+
+    async def slow_loader() -> bytes:
+        await asyncio.sleep(0.05)
+        return b"old"
+
+    loading = asyncio.create_task(cache.get_or_load(PHONE_NUMBER, VARIANT, slow_loader, slow_loader))
+    await asyncio.sleep(0.01)
+    cache.invalidate(PHONE_NUMBER)
+    assert (await loading).content == b"old"
+
+    assert (await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)).content == b"{}"
+
+
+async def test_invalidation_of_other_user_keeps_loaded_response():
+    cache = ResponseCache(max_bytes=1024, ttl=60)
+    loader = Loader()
+
+    async def slow_loader() -> bytes:
+        await asyncio.sleep(0.05)
+        return b"fresh"
+
+    loading = asyncio.create_task(cache.get_or_load(PHONE_NUMBER, VARIANT, slow_loader, slow_loader))
+    await asyncio.sleep(0.01)
+    cache.invalidate("+79180000000")
+    await loading
+
+    assert (await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)).content == b"fresh"
+    assert loader.calls == 0
+    assert not cache._generations and not cache._loads_in_flight
+
+
+async def test_response_loaded_before_clear_not_stored():
+    cache = ResponseCache(max_bytes=1024, ttl=60)
+    loader = Loader()
+
+    async def slow_loader() -> bytes:
+        await asyncio.sleep(0.05)
+        return b"old"
+
+    loading = asyncio.create_task(cache.get_or_load(PHONE_NUMBER, VARIANT, slow_loader, slow_loader))
+    await asyncio.sleep(0.01)
+    cache.clear()
+    await loading
+
+    assert (await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)).content == b"{}"
+
+
+async def test_stale_response_served_while_revalidating():
+    cache = ResponseCache(max_bytes=1024, ttl=0.05, stale_while_revalidate=10)
+    await cache.get_or_load(PHONE_NUMBER, VARIANT, Loader(b"old"), Loader(b"old"))
+    await asyncio.sleep(0.06)
+
+    revalidator = Loader(b"new")
+    assert (await cache.get_or_load(PHONE_NUMBER, VARIANT, Loader(b"unused"), revalidator)).content == b"old"
+    await asyncio.sleep(0.01)
+
+    assert revalidator.calls == 1
+    assert (await cache.get_or_load(PHONE_NUMBER, VARIANT, Loader(b"unused"), revalidator)).content == b"new"
+
+
+async def test_stale_response_served_when_load_fails():
+    cache = ResponseCache(max_bytes=1024, ttl=0.05, stale_if_error=10)
+    loader = Loader(b"old")
+    await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)
+    await asyncio.sleep(0.06)
+
+    loader.fail = True
+    assert (await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)).content == b"old"
+    assert cache.snapshot()["stale_errors"] == 1
+
+
+async def test_load_error_without_cached_response_raised():
+    cache = ResponseCache(max_bytes=1024, ttl=60, stale_if_error=10)
+    loader = Loader()
+    loader.fail = True
+
+    with pytest.raises(ConnectionError):
+        await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)
+
+
+async def test_size_bounded_by_bytes():
+    cache = ResponseCache(max_bytes=100, ttl=60)
+    for i in range(5):
+        loader = Loader(b"x" * 40)
+        await cache.get_or_load(f"+7918000000{i}", VARIANT, loader, loader)
+
+    snapshot = cache.snapshot()
+    assert snapshot["bytes"] <= 100
+    assert snapshot["entries"] == 2
+    assert snapshot["evictions"] == 3
+
+
+async def test_etag_stable_for_same_content():
+    cache = ResponseCache(max_bytes=1024, ttl=60)
+    loader = Loader(b'{"steps":[]}')
+
+    first = await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)
+    cache.invalidate(PHONE_NUMBER)
+    second = await cache.get_or_load(PHONE_NUMBER, VARIANT, loader, loader)
+
+    assert first.etag == second.etag == make_etag(b'{"steps":[]}')
+    assert first.etag != make_etag(b'{"steps":[1]}')
+
+
+@pytest.mark.parametrize(
+    ("if_none_match", "expected"),
+    [
+        (None, False),
+        ("*", True),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"other", "abc"', True),
+        ('"other"', False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, '"abc"') is expected
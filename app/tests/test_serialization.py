@@ -0,0 +1,111 @@
+import json
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import msgpack
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from schemas.user import (
+    ResponseFormat,
+    UserDetailColumnarSchema,
+    UserDetailSchema,
+    UserStepsSchema,
+    UserWaterSchema,
+    UserWeightSchema,
+)
+from services.serialization import dump_user_detail, negotiate_response_format, render_user_detail
+
+UserRow = namedtuple("UserRow", ["id", "phone_number", "username", "height"])
+
+START = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def _history(float_values: list[float]) -> dict[str, list[tuple]]:
+    moments = [
+        START + timedelta(minutes=i, microseconds=random.choice([0, 1, 500_000, 123_456]))
+        for i in range(len(float_values))
+    ]
+    return {
+        "steps": [(random.randint(0, 50_000), moment) for moment in moments],
+        "weight": [(value, moment) for value, moment in zip(float_values, moments)],
+        "water": [(value / 10, moment.astimezone(timezone(timedelta(hours=3)))) for value, moment in zip(float_values, moments)],
+    }
+
+
+async def _response_model_bytes(user: UserRow, history: dict[str, list[tuple]]) -> bytes:
+    """Ответ так, как его собирал эндпоинт /me через модели и response_model."""
+    app = FastAPI()
+
+    @app.get("/me", response_model=UserDetailSchema)
+    async def me() -> UserDetailSchema:
+        return UserDetailSchema(
+            phone_number=user.phone_number,
+            username=user.username,
+            height=user.height,
+            steps=[UserStepsSchema(steps_count=v, recorded_at=t) for v, t in history["steps"]],
+            weight=[UserWeightSchema(weight=v, recorded_at=t) for v, t in history["weight"]],
+            water=[UserWaterSchema(water_amount=v, recorded_at=t) for v, t in history["water"]],
+        )
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return (await client.get("/me")).content
+
+
+@pytest.mark.parametrize(
+    "float_values",
+    [
+        [],
+        [round(random.uniform(40, 150), 1) for _ in range(500)],
+        [random.uniform(0, 500) for _ in range(500)],
+        [0.0, 70.0, 1e16, 1e22, 0.1 + 0.2, 123456789.123],
+        [89.5, 1e-5, 3e-7],
+    ],
+    ids=["empty", "rounded", "random", "large", "tiny"],
+)
+@pytest.mark.parametrize(
+    "user",
+    [UserRow(1, "+79182294599", "user_1", 180), UserRow(2, "+79182294599", "Пользователь \"1\"", None)],
+    ids=["ascii", "unicode"],
+)
+async def test_fast_path_is_byte_identical(user, float_values):
+    history = _history(float_values)
+
+    assert dump_user_detail(user, history) == await _response_model_bytes(user, history)
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        (None, ResponseFormat.JSON),
+        ("*/*", ResponseFormat.JSON),
+        ("application/json", ResponseFormat.JSON),
+        ("application/vnd.health-tracker.columnar+json", ResponseFormat.COLUMNAR_JSON),
+        ("application/x-msgpack", ResponseFormat.COLUMNAR_MSGPACK),
+        ("application/json;q=0.5, application/vnd.health-tracker.columnar+msgpack", ResponseFormat.COLUMNAR_MSGPACK),
+        ("application/vnd.health-tracker.columnar+json;q=0.9, application/json", ResponseFormat.JSON),
+        ("text/html", ResponseFormat.JSON),
+    ],
+)
+def test_response_format_negotiation(accept, expected):
+    assert negotiate_response_format(accept) == expected
+
+
+@pytest.mark.parametrize("response_format", [ResponseFormat.COLUMNAR_JSON, ResponseFormat.COLUMNAR_MSGPACK])
+def test_columnar_user_detail(response_format):
+    user = UserRow(1, "+79182294599", "user_1", 180)
+    history = _history([70.5, 71.0, 70.8])
+
+    content = render_user_detail(user, history, response_format)
+    if response_format == ResponseFormat.COLUMNAR_MSGPACK:
+        payload = msgpack.unpackb(content)
+    else:
+        payload = json.loads(content)
+    detail = UserDetailColumnarSchema.model_validate(payload)
+
+    assert detail.weight.values == [70.5, 71.0, 70.8]
+    assert detail.weight.timestamps == [int(t.timestamp()) for _, t in history["weight"]]
+    assert detail.water.timestamps == detail.weight.timestamps
+    assert len(content) < len(dump_user_detail(user, history))
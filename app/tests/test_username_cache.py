@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from core.cache import username_cache
+from core.config import get_app_settings
+from repositories.user_repository import UserRepository
+from tests.data.user import test_users_data
+
+settings = get_app_settings()
+
+PHONE_NUMBER = test_users_data[0]["phone_number"]
+
+
+@pytest.fixture
+async def repository(fill_test_data):
+    """Репозиторий в транзакции, которая откатывается после теста."""
+    engine = create_async_engine(
+        f"postgresql+asyncpg://{settings.pg_username}:{settings.pg_password}@"
+        f"{settings.pg_host}:{settings.pg_port}/{settings.pg_database}"
+    )
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        async with AsyncSession(bind=conn, join_transaction_mode="create_savepoint") as session:
+            yield UserRepository(db_session=session)
+        await transaction.rollback()
+    await engine.dispose()
+    username_cache.clear()
+
+
+async def test_rename_frees_previous_username(repository):
+    await repository.update_user_info(phone_number=PHONE_NUMBER, update_data={"username": "First"})
+    assert username_cache.get("first") is True
+
+    await repository.update_user_info(phone_number=PHONE_NUMBER, update_data={"username": "Second"})
+
+    assert username_cache.get("first") is None
+    assert username_cache.get("second") is True
+    assert not await repository.is_username_taken(username="first")
+
+
+async def test_case_only_rename_keeps_username_taken(repository):
+    await repository.update_user_info(phone_number=PHONE_NUMBER, update_data={"username": "First"})
+    await repository.update_user_info(phone_number=PHONE_NUMBER, update_data={"username": "FIRST"})
+
+    assert username_cache.get("first") is True
+
+
+async def test_soft_delete_frees_username(repository):
+    await repository.update_user_info(phone_number=PHONE_NUMBER, update_data={"username": "First"})
+
+    assert await repository.soft_delete_user(phone_number=PHONE_NUMBER)
+
+    assert username_cache.get("first") is None
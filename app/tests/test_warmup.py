@@ -0,0 +1,19 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from core.warmup import LifecycleState, lifecycle
+from main import app
+
+
+@pytest.mark.parametrize("state", [LifecycleState.STARTING, LifecycleState.DRAINING])
+async def test_readiness_unavailable_outside_ready_state(state):
+    previous = lifecycle.state
+    lifecycle.state = state
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/health/readiness")
+    finally:
+        lifecycle.state = previous
+
+    assert response.status_code == 503
+    assert response.json() == {"status": state.value}